@@ -9,12 +9,13 @@ y sus subcarpetas, incluyendo ruta relativa, lenguaje estimado y contenido compl
 Uso:
   python exporta_programas.py
 Opcional:
-  python exporta_programas.py --out PROGRAMA.txt --max-bytes 800000 --max-lines 20000
+  python exporta_programas.py --out PROGRAMA.txt --max-bytes 800000 --max-lines 20000 --workers 16
 """
 
 import os
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Carpetas típicas de dependencias/build que suelen ser "ruido" para alimentar IA
@@ -123,49 +124,112 @@ def guess_language(path: Path) -> str:
 def should_skip_dir(dir_name: str, extra_excludes: set[str]) -> bool:
     return dir_name in DEFAULT_EXCLUDE_DIRS or dir_name in extra_excludes
 
+# Tabla de 256 entradas: 1 para bytes "de texto" (tab, lf, cr, ASCII imprimible), 0 para el resto.
+# Con bytes.translate + count la clasificación se hace en C en lugar de byte a byte en Python.
+_PRINTABLE_LUT = bytes(1 if (b in (9, 10, 13) or 32 <= b <= 126) else 0 for b in range(256))
+
+def _classify_pure(sample: bytes) -> tuple[bool, int]:
+    """Devuelve (hay_NUL, bytes_imprimibles)."""
+    if b"\x00" in sample:
+        return True, 0
+    return False, sample.translate(_PRINTABLE_LUT).count(1)
+
+# Opcional: si numba (y numpy) están instalados, el mismo recorrido se compila a código
+# nativo en un solo bucle vectorizable. Sin ellos se usa la versión translate.
+try:
+    import numpy as _np
+    from numba import njit as _njit
+
+    @_njit(cache=True)
+    def _classify_kernel(buf):
+        has_nul = False
+        printable = 0
+        for b in buf:
+            if b == 0:
+                has_nul = True
+            elif b == 9 or b == 10 or b == 13 or (32 <= b <= 126):
+                printable += 1
+        return has_nul, printable
+
+    def _classify(sample: bytes) -> tuple[bool, int]:
+        return _classify_kernel(_np.frombuffer(sample, dtype=_np.uint8))
+except ImportError:
+    _classify = _classify_pure
+
 def looks_binary_bytes(sample: bytes) -> bool:
+    has_nul, printable = _classify(sample)
     # Si hay NUL, casi seguro binario
-    if b"\x00" in sample:
+    if has_nul:
         return True
     # Cuenta caracteres "raros" fuera de rango habitual de texto
     # Permitimos UTF-8, pero una muestra con muchos bytes <9 o >127 no siempre es binario.
     # Nos basamos en ratio de bytes imprimibles/espacios/nuevas líneas.
-    printable = 0
-    for b in sample:
-        if b in (9, 10, 13):  # tab, lf, cr
-            printable += 1
-        elif 32 <= b <= 126:
-            printable += 1
     ratio = printable / max(1, len(sample))
     return ratio < 0.70
 
-def read_text_safely(path: Path, max_bytes: int) -> tuple[str | None, str | None]:
+# Igual que _PRINTABLE_LUT pero para letras ASCII (solo se usa si el texto es ASCII puro).
+_ALPHA_LUT = bytes(1 if chr(b).isalpha() else 0 for b in range(128)) + bytes(128)
+# Para archivos grandes basta una muestra inicial para las proporciones.
+_RATIO_SAMPLE_THRESHOLD = 200_000
+_RATIO_SAMPLE_CHARS = 64 * 1024
+
+def count_alpha(text: str) -> int:
+    if text.isascii():
+        return text.encode("ascii").translate(_ALPHA_LUT).count(1)
+    # Fuera de ASCII, str.isalpha exacto: ni \W ni \d excluyen numéricos como '²' o '½'.
+    return sum(map(str.isalpha, text))
+
+def decode_text(data: bytes) -> tuple[str, str | None]:
+    """
+    Decodifica bytes ya leídos como lo haría read_text() (newlines universales).
+    """
+    # Intentamos UTF-8 primero; si falla, probamos latin-1 como fallback “no ideal”
+    try:
+        text, note = data.decode("utf-8"), None
+    except UnicodeDecodeError:
+        text, note = data.decode("latin-1"), "WARN: decoded with latin-1 (utf-8 failed)"
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text, note
+
+def read_text_safely(entry: os.DirEntry, max_bytes: int) -> tuple[str | None, str | None]:
     """
     Devuelve (texto, error). Si el archivo parece binario o excede max_bytes => (None, reason)
+    Usa el stat cacheado del DirEntry y abre/lee el archivo una sola vez.
     """
     try:
-        size = path.stat().st_size
+        size = entry.stat().st_size
         if size > max_bytes:
             return None, f"SKIP: too large ({size} bytes > {max_bytes})"
 
-        with open(path, "rb") as f:
-            sample = f.read(min(8192, size))
-            if looks_binary_bytes(sample):
-                return None, "SKIP: looks binary / non-text"
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        if looks_binary_bytes(data[:8192]):
+            return None, "SKIP: looks binary / non-text"
 
-        # Intentamos UTF-8 primero; si falla, probamos latin-1 como fallback “no ideal”
-        try:
-            text = path.read_text(encoding="utf-8")
-            return text, None
-        except UnicodeDecodeError:
-            text = path.read_text(encoding="latin-1")
-            return text, "WARN: decoded with latin-1 (utf-8 failed)"
+        return decode_text(data)
     except Exception as e:
         return None, f"SKIP: read error ({e})"
 
+_LINE_SCAN_CHUNK = 64 * 1024
+
 def count_lines(text: str) -> int:
     return text.count("\n") + 1
 
+def count_lines_capped(text: str, cap: int) -> int:
+    """
+    Como count_lines pero devuelve como mucho cap + 1: cuenta por trozos y corta
+    en cuanto se supera el límite, sin recorrer el resto del archivo.
+    """
+    if len(text) < _LINE_SCAN_CHUNK:
+        return min(count_lines(text), cap + 1)
+    n = 1
+    for start in range(0, len(text), _LINE_SCAN_CHUNK):
+        n += text.count("\n", start, start + _LINE_SCAN_CHUNK)
+        if n > cap:
+            return cap + 1
+    return n
+
 def likely_machine_or_library_dump(text: str) -> bool:
     """
     Heurística adicional para evitar “cosas enormes sin sentido humano”:
@@ -184,8 +248,10 @@ def likely_machine_or_library_dump(text: str) -> bool:
         return True
 
     # ratio simple de "caracteres alfabéticos" vs total
+    if len(text) > _RATIO_SAMPLE_THRESHOLD:
+        text = text[:_RATIO_SAMPLE_CHARS]
     total = len(text)
-    alpha = sum(ch.isalpha() for ch in text)
+    alpha = count_alpha(text)
     space = text.count(" ")
     # si es casi todo símbolos y nada de letras/espacios, sospechoso
     if (alpha / max(1, total) < 0.08) and (space / max(1, total) < 0.03):
@@ -193,13 +259,13 @@ def likely_machine_or_library_dump(text: str) -> bool:
 
     return False
 
-def should_include_file(path: Path, max_bytes: int, max_lines: int) -> tuple[bool, str | None, str | None]:
+def should_include_file(entry: os.DirEntry, max_bytes: int, max_lines: int) -> tuple[bool, str | None, str | None]:
     """
     Decide si incluir el archivo.
     Devuelve (include, text, note)
     """
-    ext = path.suffix.lower()
-    name = path.name
+    name = entry.name
+    ext = os.path.splitext(name)[1].lower()
 
     if is_minified_name(name):
         return False, None, "SKIP: minified filename"
@@ -207,14 +273,13 @@ def should_include_file(path: Path, max_bytes: int, max_lines: int) -> tuple[boo
     if ext in BINARY_EXTS:
         return False, None, f"SKIP: binary ext {ext}"
 
-    text, err = read_text_safely(path, max_bytes=max_bytes)
+    text, err = read_text_safely(entry, max_bytes=max_bytes)
     if text is None:
         return False, None, err
 
     # límite de líneas
-    lines = count_lines(text)
-    if lines > max_lines:
-        return False, None, f"SKIP: too many lines ({lines} > {max_lines})"
+    if count_lines_capped(text, max_lines) > max_lines:
+        return False, None, f"SKIP: too many lines (> {max_lines})"
 
     if likely_machine_or_library_dump(text):
         return False, None, "SKIP: looks like minified/dump/library noise"
@@ -222,29 +287,49 @@ def should_include_file(path: Path, max_bytes: int, max_lines: int) -> tuple[boo
     return True, text, err  # err puede ser WARN
 
 def iter_files(root: Path, extra_excludes: set[str]):
-    for dirpath, dirnames, filenames in os.walk(root):
-        # filtra dirs in-place para que os.walk no entre
-        dirnames[:] = [d for d in dirnames if not should_skip_dir(d, extra_excludes)]
-
-        for fn in filenames:
-            yield Path(dirpath) / fn
+    """
+    Recorre root con os.scandir (mismo orden que os.walk topdown: primero los archivos
+    de cada carpeta, luego sus subcarpetas). Devuelve DirEntry para reutilizar su stat.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # como os.walk(followlinks=False): no entramos en symlinks a carpetas
+            if not should_skip_dir(entry.name, extra_excludes) and not entry.is_symlink():
+                subdirs.append(entry.path)
+        else:
+            yield entry
+    for d in subdirs:
+        yield from iter_files(d, extra_excludes)
+
+SEP = "=" * 90
 
 def write_block(out_f, rel_path: str, language: str, note: str | None, content: str):
-    sep = "=" * 90
-    out_f.write(sep + "\n")
-    out_f.write(f"BEGIN_FILE: {rel_path}\n")
-    out_f.write(f"LANGUAGE: {language}\n")
-    if note:
-        out_f.write(f"NOTE: {note}\n")
-    out_f.write("CONTENT_START\n")
-    out_f.write("```text\n")
-    out_f.write(content)
-    if not content.endswith("\n"):
-        out_f.write("\n")
-    out_f.write("```\n")
-    out_f.write("CONTENT_END\n")
-    out_f.write(f"END_FILE: {rel_path}\n")
-    out_f.write(sep + "\n\n")
+    # Se arma el bloque completo y se escribe de una vez (un solo encode/lock por archivo)
+    note_line = f"NOTE: {note}\n" if note else ""
+    tail_nl = "" if content.endswith("\n") else "\n"
+    out_f.write(
+        f"{SEP}\n"
+        f"BEGIN_FILE: {rel_path}\n"
+        f"LANGUAGE: {language}\n"
+        f"{note_line}"
+        "CONTENT_START\n"
+        "```text\n"
+        f"{content}{tail_nl}"
+        "```\n"
+        "CONTENT_END\n"
+        f"END_FILE: {rel_path}\n"
+        f"{SEP}\n\n"
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="Exporta código a PROGRAMA.txt para alimentar a una IA.")
@@ -252,6 +337,7 @@ def main():
     parser.add_argument("--max-bytes", type=int, default=800_000, help="Tamaño máximo por archivo (default: 800000 bytes)")
     parser.add_argument("--max-lines", type=int, default=20_000, help="Líneas máximas por archivo (default: 20000)")
     parser.add_argument("--exclude-dir", action="append", default=[], help="Añadir carpetas a excluir (puedes repetir)")
+    parser.add_argument("--workers", type=int, default=16, help="Hilos de lectura en paralelo (default: 16)")
     args = parser.parse_args()
 
     root = Path.cwd()
@@ -261,7 +347,8 @@ def main():
     written = 0
     skipped = 0
 
-    with open(out_path, "w", encoding="utf-8") as out_f:
+    # buffer grande: los bloques se acumulan en memoria y se vuelcan en pocas escrituras
+    with open(out_path, "w", encoding="utf-8", buffering=1 << 20) as out_f:
         out_f.write("# PROGRAMA.txt\n")
         out_f.write(f"# Root: {root}\n")
         out_f.write(f"# max_bytes={args.max_bytes}, max_lines={args.max_lines}\n")
@@ -270,24 +357,36 @@ def main():
             out_f.write(f"# excluded_dirs(extra)={sorted(extra_excludes)}\n")
         out_f.write("\n")
 
-        for path in iter_files(root, extra_excludes):
-            # No re-exportar el archivo de salida si está en la raíz
+        # No re-exportar el archivo de salida: se identifica por inodo (cacheado en el
+        # DirEntry) y solo se confirma con samefile ante coincidencia o symlink.
+        out_ino = os.stat(out_path).st_ino
+        entries = []
+        for entry in iter_files(root, extra_excludes):
             try:
-                if path.resolve() == out_path.resolve():
+                if (entry.inode() == out_ino or entry.is_symlink()) and os.path.samefile(entry.path, out_path):
                     continue
-            except Exception:
+            except OSError:
                 pass
-
-            rel_path = str(path.relative_to(root))
-            language = guess_language(path)
-
-            include, text, note = should_include_file(path, args.max_bytes, args.max_lines)
-            if not include:
-                skipped += 1
-                continue
-
-            write_block(out_f, rel_path=rel_path, language=language, note=note, content=text)
-            written += 1
+            entries.append(entry)
+
+        # La lectura/clasificación es I/O (read() suelta el GIL) y va en paralelo;
+        # la escritura sigue siendo secuencial y en el orden del recorrido.
+        # Se procesa por ventanas para no tener todos los textos en memoria a la vez.
+        window = max(1, args.workers) * 8
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as ex:
+            for start in range(0, len(entries), window):
+                chunk = entries[start:start + window]
+                results = ex.map(lambda e: should_include_file(e, args.max_bytes, args.max_lines), chunk)
+                for entry, (include, text, note) in zip(chunk, results):
+                    if not include:
+                        skipped += 1
+                        continue
+
+                    path = Path(entry.path)
+                    rel_path = str(path.relative_to(root))
+                    language = guess_language(path)
+                    write_block(out_f, rel_path=rel_path, language=language, note=note, content=text)
+                    written += 1
 
         out_f.write("\n")
         out_f.write("# SUMMARY\n")
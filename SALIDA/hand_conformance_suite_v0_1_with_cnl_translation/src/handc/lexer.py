@@ -2,6 +2,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Tuple
 import re
+import sys
 import unicodedata
 
 from .diagnostics import Diagnostic, SrcLoc
@@ -179,7 +180,8 @@ def lex(text: str, filename: str="<input>") -> Tuple[List[Token], List[Diagnosti
                 j=i+1
                 while j < len(line) and ord(line[j]) > 127 and _is_emoji_continue(line[j]):
                     j+=1
-                val=line[i:j]
+                # interned: the set of emoji values is tiny and consumers match them against constants
+                val=sys.intern(line[i:j])
                 tokens.append(Token(TK_EMOJI, val, Span(filename, li, col, col+(j-i))))
                 col += (j-i); i=j; continue
 
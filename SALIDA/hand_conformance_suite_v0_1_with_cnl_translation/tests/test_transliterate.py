@@ -2,7 +2,7 @@ from __future__ import annotations
 from pathlib import Path
 import pytest
 
-from transliterate import validate_translation
+from transliterate import _prepare, validate_translation
 
 
 BASE = """🎬 PROGRAMA:
@@ -83,3 +83,18 @@ def test_reject_unmarked_string_change():
 def test_reject_marker_emoji_change():
     v = validate_translation(BASE, BAD_EMOJI_CHANGED, "base", "bad3")
     assert v and any("Token value mismatch" in x.message or "kind mismatch" in x.message for x in v)
+
+def test_base_prepared_once_across_candidates():
+    _prepare.cache_clear()
+    for cand in (ES_OK, PT_OK, BAD_EMOJI_CHANGED):
+        validate_translation(BASE, cand, "base", "cand")
+    info = _prepare.cache_info()
+    assert info.hits == 2 and info.misses == 4
+
+def test_identical_candidate_skips_lexing():
+    _prepare.cache_clear()
+    assert validate_translation(BASE, BASE, "base", "same") == []
+    assert _prepare.cache_info().misses == 1
+    bad = 'show "unterminated\n'
+    v = validate_translation(bad, bad, "base", "same")
+    assert v and v[0].message.startswith("Base lex errors")
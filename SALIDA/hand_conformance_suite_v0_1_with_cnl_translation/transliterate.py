@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import itertools
+import operator
+import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
-import re
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
-from handc.lexer import lex, Token
+from handc.lexer import lex, Token, TK_EMOJI, TK_STRING
 from handc.diagnostics import Diagnostic
 
 
@@ -29,11 +32,12 @@ from handc.diagnostics import Diagnostic
 # Note: This script validates. It does not perform machine translation.
 
 
-TRANSLATABLE_MARKER = "🌐"
+# Interned like the lexer's EMOJI values, so the marker test is a pointer hit.
+TRANSLATABLE_MARKER = sys.intern("🌐")
 DESCRIPTION_HEADER = "📋 DESCRIPCIÓN:"  # canonical header line, must remain in code
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SpanRef:
     file: str
     line: int
@@ -41,19 +45,28 @@ class SpanRef:
     end_col: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Violation:
     where: SpanRef
     message: str
 
 
+_KIND = operator.attrgetter("kind")
+_VALUE = operator.attrgetter("value")
+
+
 def _read_text(p: Path) -> str:
     return p.read_text(encoding="utf-8")
 
 
-def _description_lines(src: str) -> Set[int]:
+def _analyze(src: str) -> Tuple[List[str], int, Dict[int, str]]:
     """
-    Return 1-based line numbers that are inside the 📋 DESCRIPCIÓN: block.
+    Split src once and locate the 📋 DESCRIPCIÓN: block.
+
+    Returns (lines, header_idx, masked): header_idx is the 0-based index of the
+    header line (-1 if absent) and masked maps the 1-based line numbers of the
+    block body to their lexable placeholder (see _mask_description), so the
+    body is classified once and its keys are the editable lines.
 
     Definition (v0.1):
       - The block starts at the line that begins with DESCRIPTION_HEADER.
@@ -62,94 +75,122 @@ def _description_lines(src: str) -> Set[int]:
         or end of file.
     """
     lines = src.splitlines()
-    desc_start_idx: Optional[int] = None
+    hdr = -1
     for i, ln in enumerate(lines):
         if ln.strip() == DESCRIPTION_HEADER:
-            desc_start_idx = i
+            hdr = i
             break
-    if desc_start_idx is None:
-        return set()
-
-    editable: Set[int] = set()
-    editable.add(desc_start_idx + 1)  # header line itself is allowed to move? No. But content in body is allowed.
-    # Actually: header is CODE and must remain. We'll mark only body as editable.
-    editable.remove(desc_start_idx + 1)
-
-    for j in range(desc_start_idx + 1, len(lines)):
-        ln = lines[j]
-        if ln.strip() == "":
-            # blank lines in description are allowed; keep them in editable region
-            editable.add(j + 1)
-            continue
-        if ln.startswith("    "):  # 4 spaces
-            editable.add(j + 1)
-            continue
-        # dedent ends description block
-        break
-    return editable
-
 
+    # The header line itself is CODE and must remain; only the body is editable.
+    masked: Dict[int, str] = {}
+    if hdr >= 0:
+        for j in range(hdr + 1, len(lines)):
+            ln = lines[j]
+            if not ln or ln.isspace():
+                # blank lines in description are allowed; keep them in editable region
+                masked[j + 1] = ""
+                continue
+            if ln.startswith("    "):  # 4 spaces
+                # preserve indentation (>=4 spaces) and replace remainder with an empty string literal
+                masked[j + 1] = ln[:len(ln) - len(ln.lstrip())] + '""'
+                continue
+            # dedent ends description block
+            break
+    return lines, hdr, masked
 
 
-def _mask_description(src: str, editable_lines: Set[int]) -> str:
+def _mask_description(lines: List[str], masked: Dict[int, str], trailing_nl: bool) -> str:
     """
     Replace DESCRIPTION-body lines with lexable placeholders so the HAND lexer can run.
 
     Rationale: HAND v0.1 lexer is intentionally strict; natural language punctuation (.,!?)
     may not be valid as code tokens. Since DESCRIPTION is non-code, we mask it before lexing.
     """
-    out_lines=[]
-    for i, ln in enumerate(src.splitlines(), start=1):
-        if i in editable_lines:
-            if ln.strip()=="":
-                out_lines.append("")
-            else:
-                # preserve indentation (>=4 spaces) and replace remainder with an empty string literal
-                m = re.match(r"^(\s+)", ln)
-                indent = m.group(1) if m else ""
-                out_lines.append(f"{indent}\"\"")
-        else:
-            out_lines.append(ln)
-    return "\n".join(out_lines) + ("\n" if src.endswith("\n") else "")
-
+    get = masked.get
+    return "\n".join([get(i, ln) for i, ln in enumerate(lines, start=1)]) + ("\n" if trailing_nl else "")
+
+
+@dataclass(frozen=True, slots=True)
+class _Prepared:
+    lines: Tuple[str, ...]
+    header_idx: int              # -1 when there is no 📋 DESCRIPCIÓN block
+    has_header: bool             # a line is exactly DESCRIPTION_HEADER
+    editable: FrozenSet[int]
+    tokens: Tuple[Token, ...]
+    diags: Tuple[Diagnostic, ...]
+    translatable: FrozenSet[int]
+    kept: Tuple[Tuple[int, Token], ...]  # (index, token) outside the description body
+    kept_kinds: Tuple[str, ...]
+    kept_values: Tuple[Optional[str], ...]  # None for 🌐-marked strings
+
+
+@functools.lru_cache(maxsize=128)
+def _prepare(src: str, name: str) -> _Prepared:
+    """
+    Split, mask and lex one source, and project the tokens compared by
+    validate_translation.
 
-def _is_translatable_string(tokens: List[Token], idx: int) -> bool:
+    Cached: a batch validation compares one base against many candidates, so the
+    base is masked and lexed once. Everything returned is immutable; use
+    _prepare.cache_clear() to drop the cache.
     """
-    Returns True if tokens[idx] is a STRING token and is preceded by a 🌐 marker emoji.
+    lines, hdr, masked = _analyze(src)
+    toks, diags = lex(_mask_description(lines, masked, src.endswith("\n")), name)
+    # An exact header line also strip-matches, so none exists when hdr < 0 and the
+    # first candidate is usually it; only a padded first header needs the rest scanned.
+    has_header = hdr >= 0 and (lines[hdr] == DESCRIPTION_HEADER or DESCRIPTION_HEADER in lines[hdr + 1:])
+    editable = frozenset(masked)
+    tokens = tuple(toks)
+    trans = _translatable_indices(tokens)
+    kept = tuple(_iter_kept(tokens, editable))
+    kept_toks = [t for _, t in kept]
+    kept_values = [None if i in trans else t.value for i, t in kept] if trans else map(_VALUE, kept_toks)
+    return _Prepared(
+        tuple(lines), hdr, has_header, editable, tokens, tuple(diags),
+        trans, kept, tuple(map(_KIND, kept_toks)), tuple(kept_values),
+    )
+
+
+def _translatable_indices(tokens: Tuple[Token, ...]) -> FrozenSet[int]:
     """
-    t = tokens[idx]
-    if t.kind != "STRING":
-        return False
+    Indices of the STRING tokens preceded by a 🌐 marker emoji, in one forward pass.
+    """
+    out: Set[int] = set()
+    after_marker = False
+    for i, t in enumerate(tokens):
+        # lexer doesn't emit whitespace tokens; skip NL only
+        if t.kind == "NL":
+            continue
+        if after_marker and t.kind is TK_STRING:
+            out.add(i)
+        after_marker = t.kind is TK_EMOJI and t.value == TRANSLATABLE_MARKER
+    return frozenset(out)
+
 
-    # find previous non-NL token (lexer doesn't emit whitespace tokens; skip NL only)
-    k = idx - 1
-    while k >= 0 and tokens[k].kind in ("NL",):
-        k -= 1
-    if k < 0:
-        return False
-    prev = tokens[k]
-    return prev.kind == "EMOJI" and prev.value == TRANSLATABLE_MARKER
+def _iter_kept(tokens: Tuple[Token, ...], editable_lines: FrozenSet[int]) -> Iterator[Tuple[int, Token]]:
+    """(index, token) for the tokens outside the description body, in order."""
+    return ((i, t) for i, t in enumerate(tokens) if t.span.line not in editable_lines)
 
 
 def validate_translation(base_src: str, cand_src: str, base_name: str = "base", cand_name: str = "candidate") -> List[Violation]:
     violations: List[Violation] = []
 
-    base_desc = _description_lines(base_src)
-    cand_desc = _description_lines(cand_src)
+    base = _prepare(base_src, base_name)
+    # An unchanged candidate is trivially deterministic; only base lex errors remain
+    # to report, and the full path below handles those.
+    if cand_src == base_src and not base.diags:
+        return violations
+    cand = _prepare(cand_src, cand_name)
+    base_diags = base.diags
+    cand_diags = cand.diags
 
     # The DESCRIPTION header must exist in both or neither; if it exists in one, it's a code delta.
-    base_has = DESCRIPTION_HEADER in base_src.splitlines()
-    cand_has = DESCRIPTION_HEADER in cand_src.splitlines()
+    base_has = base.has_header
+    cand_has = cand.has_header
     if base_has != cand_has:
         violations.append(Violation(SpanRef(cand_name, 1, 1, 1), "📋 DESCRIPCIÓN block presence differs between base and candidate."))
         return violations
 
-    base_src_masked = _mask_description(base_src, base_desc)
-    cand_src_masked = _mask_description(cand_src, cand_desc)
-
-    base_toks, base_diags = lex(base_src_masked, base_name)
-    cand_toks, cand_diags = lex(cand_src_masked, cand_name)
-
     # Lexing MUST be deterministic and error-free for both.
     if base_diags:
         violations.append(Violation(SpanRef(base_name, 1, 1, 1), f"Base lex errors: {len(base_diags)}"))
@@ -175,71 +216,58 @@ def validate_translation(base_src: str, cand_src: str, base_name: str = "base",
     # For robust comparison despite description edits, we treat tokens in description lines as "skipped":
     # we remove those tokens from both streams and compare the remaining streams.
 
-    def filter_tokens(tokens: List[Token], editable_lines: Set[int]) -> List[Tuple[int, Token]]:
-        kept=[]
-        for i,t in enumerate(tokens):
-            if t.span.line in editable_lines:
-                continue
-            kept.append((i,t))
-        return kept
-
-    base_kept = filter_tokens(base_toks, base_desc)
-    cand_kept = filter_tokens(cand_toks, cand_desc)
-
     # Now, compare kept streams allowing marked string deltas.
-    bi=ci=0
-    while bi < len(base_kept) and ci < len(cand_kept):
-        bidx, bt = base_kept[bi]
-        cidx, ct = cand_kept[ci]
-
-        # Align on kind as a first approximation.
-        if bt.kind != ct.kind:
-            violations.append(Violation(
-                SpanRef(cand_name, ct.span.line, ct.span.col, ct.span.end_col),
-                f"Token kind mismatch outside 📋 DESCRIPCIÓN: base={bt.kind} candidate={ct.kind}"
-            ))
-            return violations
+    # Fast path: equal kinds and equal values (marked strings projected to None on
+    # both sides) compare as two C-level tuple equalities and cannot produce a
+    # violation below; any difference is located by the per-token walk.
+    base_trans = base.translatable
+    cand_trans = cand.translatable
+    if base.kept_kinds != cand.kept_kinds or base.kept_values != cand.kept_values:
+        for b, c in itertools.zip_longest(base.kept, cand.kept):
+            if b is None or c is None:
+                # Token count differs outside description; illegal.
+                where = SpanRef(cand_name, 1, 1, 1)
+                violations.append(Violation(where, "Token stream length differs outside 📋 DESCRIPCIÓN (illegal code change)."))
+                return violations
+            bidx, bt = b
+            cidx, ct = c
 
-        # For strings: allow change only if both are translatable strings (🌐 marker) in their respective streams.
-        if bt.kind == "STRING":
-            base_ok = _is_translatable_string(base_toks, bidx)
-            cand_ok = _is_translatable_string(cand_toks, cidx)
-            if base_ok and cand_ok:
-                # Marker must remain identical; enforced by token stream since 🌐 emoji token is outside description
-                pass
+            # Align on kind as a first approximation. Token kinds are the lexer's TK_*
+            # constants (one str object per kind), so identity is equality here.
+            if bt.kind is not ct.kind:
+                violations.append(Violation(
+                    SpanRef(cand_name, ct.span.line, ct.span.col, ct.span.end_col),
+                    f"Token kind mismatch outside 📋 DESCRIPCIÓN: base={bt.kind} candidate={ct.kind}"
+                ))
+                return violations
+
+            # For strings: allow change only if both are translatable strings (🌐 marker) in their respective streams.
+            if bt.kind is TK_STRING:
+                if bidx in base_trans and cidx in cand_trans:
+                    # Marker must remain identical; enforced by token stream since 🌐 emoji token is outside description
+                    pass
+                else:
+                    if bt.value != ct.value:
+                        violations.append(Violation(
+                            SpanRef(cand_name, ct.span.line, ct.span.col, ct.span.end_col),
+                            "Unmarked string literal changed (only 🌐-marked literals may change)."
+                        ))
+                        return violations
             else:
+                # All other tokens must match value exactly.
                 if bt.value != ct.value:
                     violations.append(Violation(
                         SpanRef(cand_name, ct.span.line, ct.span.col, ct.span.end_col),
-                        "Unmarked string literal changed (only 🌐-marked literals may change)."
+                        f"Token value mismatch outside 📋 DESCRIPCIÓN: base={bt.value!r} candidate={ct.value!r}"
                     ))
                     return violations
-        else:
-            # All other tokens must match value exactly.
-            if bt.value != ct.value:
-                violations.append(Violation(
-                    SpanRef(cand_name, ct.span.line, ct.span.col, ct.span.end_col),
-                    f"Token value mismatch outside 📋 DESCRIPCIÓN: base={bt.value!r} candidate={ct.value!r}"
-                ))
-                return violations
-
-        bi += 1
-        ci += 1
-
-    if bi != len(base_kept) or ci != len(cand_kept):
-        # Token count differs outside description; illegal.
-        where = SpanRef(cand_name, 1, 1, 1)
-        violations.append(Violation(where, "Token stream length differs outside 📋 DESCRIPCIÓN (illegal code change)."))
-        return violations
 
     # Additional: ensure DESCRIPTION header line itself is unchanged (since we filtered body only).
     # We compare raw lines containing the header.
     if base_has:
-        base_lines = base_src.splitlines()
-        cand_lines = cand_src.splitlines()
-        base_hdr_idx = next(i for i,l in enumerate(base_lines) if l.strip()==DESCRIPTION_HEADER)
-        cand_hdr_idx = next(i for i,l in enumerate(cand_lines) if l.strip()==DESCRIPTION_HEADER)
-        if base_lines[base_hdr_idx].strip() != cand_lines[cand_hdr_idx].strip():
+        base_hdr_idx = base.header_idx
+        cand_hdr_idx = cand.header_idx
+        if base.lines[base_hdr_idx].strip() != cand.lines[cand_hdr_idx].strip():
             violations.append(Violation(SpanRef(cand_name, cand_hdr_idx+1, 1, 1), "📋 DESCRIPCIÓN header line changed (must remain canonical)."))
             return violations
 
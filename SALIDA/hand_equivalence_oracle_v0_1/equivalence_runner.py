@@ -1,13 +1,20 @@
 from __future__ import annotations
 import argparse
+import functools
+import hashlib
 import json
+import os
+import pickle
 import re
 import subprocess
 import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import handc
 from handc.lexer import lex
 from handc.parser import parse
 from handc.typecheck import typecheck
@@ -38,22 +45,33 @@ from handc.html_gen import gen_html
 SUPPORTED_TARGETS = ["python", "wasm", "sql", "html"]
 
 
+# Feature scan: one compiled alternation finds every keyword/type word in a
+# single pass; operators and emoji markers are plain substring tests.
+_FEATURE_WORDS: Dict[str, str] = {
+    **{kw: kw for kw in ("show","ask","if","else","while","return","not","and","or")},
+    **{t: f"type:{t}" for t in ("Int","Float","Bool","Text","Null")},
+}
+_FEATURE_WORD_RE = re.compile(r"\b(" + "|".join(_FEATURE_WORDS) + r")\b")
+_FEATURE_OPS: Tuple[Tuple[str, str], ...] = tuple(
+    (op, f"op:{op}") for op in ("+","-","*","/","==","!=",">=","<=",">","<")
+)
+
+
+# Deliberately not one combined alternation: the `in` tests run at memchr speed,
+# while folding the operators and emojis into the word regex makes every position
+# try every branch (and needs lookahead to keep overlapping operators such as the
+# "==" in "!=="); measured 1.4-1.8x slower than this.
 def _feature_scan(src: str) -> List[str]:
-    feats=set()
-    for kw in ["show","ask","if","else","while","return","not","and","or"]:
-        if re.search(rf"\b{kw}\b", src):
-            feats.add(kw)
+    feats={_FEATURE_WORDS[m] for m in _FEATURE_WORD_RE.findall(src)}
     if "🔍" in src: feats.add("verify")
     if "🛡️" in src: feats.add("capabilities")
-    for t in ["Int","Float","Bool","Text","Null"]:
-        if re.search(rf"\b{t}\b", src): feats.add(f"type:{t}")
-    for op in ["+","-","*","/","==","!=",">=", "<=" ,">","<"]:
-        if op in src: feats.add(f"op:{op}")
+    for op, feat in _FEATURE_OPS:
+        if op in src: feats.add(feat)
     return sorted(feats)
 
 
 def _run_ref(program_ast, inputs: List[str]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]:
-    it = Interpreter(inputs=inputs)
+    it = Interpreter(inputs=inputs, record_trace=False)  # the oracle only compares Ω and Σ
     try:
         rr = it.run(program_ast)
         return {"Ω": rr.outputs, "Σ": rr.final_store}, None, None
@@ -61,8 +79,46 @@ def _run_ref(program_ast, inputs: List[str]) -> Tuple[Optional[Dict[str, Any]],
         return {"Ω": [], "Σ": {}}, {"message": str(e)}, "runtime_error"
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_generated(code: str) -> Any:
+    return compile(code, "<hand-gen>", "exec")
+
+
+def _run_python_inprocess(code: str, inputs: List[str]) -> Optional[Dict[str, Any]]:
+    """Execute the generated module in this process and return what its JSON
+    entry point would print, decoded. None means the run raised; the caller then
+    repeats it in a subprocess so the failure report (rc/stderr) is unchanged."""
+    # dataclasses resolve string annotations through sys.modules, so the module
+    # must be registered while it executes
+    mod = types.ModuleType("__hand_gen__")
+    sys.modules[mod.__name__] = mod
+    try:
+        exec(_compile_generated(code), mod.__dict__)
+        out = mod.__dict__["__hand_main"](list(inputs))
+        # same JSON round trip as the subprocess's stdout
+        return json.loads(json.dumps(out, ensure_ascii=False))
+    except (Exception, SystemExit):
+        # SystemExit is the one non-Exception generated code can raise; Ctrl-C still stops the run
+        return None
+    finally:
+        sys.modules.pop(mod.__name__, None)
+
+
+# Script written for the subprocess fallback; pool workers get a per-process name
+# (see _init_worker) so concurrent fallbacks in one cwd do not clobber each other.
+_GEN_TMP_NAME = "_equiv_tmp_gen.py"
+
+
+def _init_worker() -> None:
+    global _GEN_TMP_NAME
+    _GEN_TMP_NAME = f"_equiv_tmp_gen.{os.getpid()}.py"
+
+
 def _run_python_generated(code: str, inputs: List[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-    tmp = Path("_equiv_tmp_gen.py")
+    out = _run_python_inprocess(code, inputs)
+    if out is not None:
+        return {"Ω": out.get("outputs"), "Σ": out.get("store")}, None
+    tmp = Path(_GEN_TMP_NAME)
     tmp.write_text(code, encoding="utf-8")
     p = subprocess.run([sys.executable, str(tmp), json.dumps(inputs, ensure_ascii=False)], capture_output=True, text=True)
     if p.returncode != 0:
@@ -80,7 +136,51 @@ def _run_python_generated(code: str, inputs: List[str]) -> Tuple[Optional[Dict[s
     return {"Ω": Ω, "Σ": Σ}, None
 
 
-def compile_to_ir(src: str, file_name: str, level: int, enforce_caps: bool) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+# compile_to_ir results (AST + IR, or the failing stage's diagnostics) can be
+# pickled under a cache directory, keyed by the source, the compile parameters
+# and a digest of the handc sources, so repeated sweeps over the same programs
+# skip the front end. Bump _CACHE_FORMAT when the cached layout changes.
+_CACHE_FORMAT = "1"
+_handc_digest: Optional[str] = None
+
+
+def _handc_fingerprint() -> str:
+    global _handc_digest
+    if _handc_digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        for f in sorted(Path(handc.__file__).parent.glob("*.py")):
+            h.update(f.name.encode("utf-8"))
+            h.update(f.read_bytes())
+        _handc_digest = h.hexdigest()
+    return _handc_digest
+
+
+def compile_to_ir(src: str, file_name: str, level: int, enforce_caps: bool, cache_dir: Optional[Path] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if cache_dir is None:
+        return _compile_to_ir(src, file_name, level, enforce_caps)
+    h = hashlib.blake2b(digest_size=20)
+    for part in (_CACHE_FORMAT, _handc_fingerprint(), file_name, str(level), str(enforce_caps), src):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    path = cache_dir / f"{h.hexdigest()}.pkl"
+    try:
+        with path.open("rb") as f:
+            return pickle.load(f)
+    except Exception:
+        pass  # missing or unreadable entry: recompute
+    res = _compile_to_ir(src, file_name, level, enforce_caps)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        pass  # the cache is an optimisation; never fail the run over it
+    return res
+
+
+def _compile_to_ir(src: str, file_name: str, level: int, enforce_caps: bool) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     toks, di = lex(src, file_name)
     if di:
         return {}, {"stage":"lexer","diagnostics":[d.__dict__ for d in di]}
@@ -103,12 +203,53 @@ def compile_to_ir(src: str, file_name: str, level: int, enforce_caps: bool) -> T
     return {"ast": pres.program, "ir": ir}, {}
 
 
-def run_equivalence(program_path: Path, targets: List[str], level: int, inputs: Optional[List[str]] = None, enforce_caps: bool = False) -> Dict[str, Any]:
+# Backend outputs memoized per (backend, IR digest): the same IR (a program
+# listed again, or swept over several levels) is generated once per process,
+# and once per cache directory when one is given. Only successful generations
+# are kept; a backend that raises is simply rerun. Results are shared, so
+# callers must not mutate them.
+_CODEGEN_MEMO: Dict[Tuple[str, str], Any] = {}
+
+
+def _ir_digest(ir: Dict[str, Any]) -> str:
+    blob = json.dumps(ir, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def _codegen(backend: str, gen: Callable[[], Any], ir_key: str, cache_dir: Optional[Path]) -> Any:
+    key = (backend, ir_key)
+    res = _CODEGEN_MEMO.get(key)
+    if res is not None:
+        return res
+    path = None
+    if cache_dir is not None:
+        # the handc digest keeps entries from outliving a backend change
+        path = cache_dir / "codegen" / backend / f"{ir_key}-{_handc_fingerprint()}.pkl"
+        try:
+            with path.open("rb") as f:
+                res = _CODEGEN_MEMO[key] = pickle.load(f)
+                return res
+        except Exception:
+            pass  # missing or unreadable entry: regenerate
+    res = _CODEGEN_MEMO[key] = gen()
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            pass  # the cache is an optimisation; never fail the run over it
+    return res
+
+
+def run_equivalence(program_path: Path, targets: List[str], level: int, inputs: Optional[List[str]] = None, enforce_caps: bool = False, cache_dir: Optional[Path] = None) -> Dict[str, Any]:
     src = program_path.read_text(encoding="utf-8")
     inputs = inputs or []
     feats = _feature_scan(src)
 
-    comp, err = compile_to_ir(src, program_path.name, level=level, enforce_caps=enforce_caps)
+    comp, err = compile_to_ir(src, program_path.name, level=level, enforce_caps=enforce_caps, cache_dir=cache_dir)
     if err:
         return {"program": program_path.name, "status": "compile_error", "error": err, "features": feats, "results": {}}
 
@@ -117,10 +258,11 @@ def run_equivalence(program_path: Path, targets: List[str], level: int, inputs:
 
     ref_obs, ref_err, ref_status = _run_ref(ast, inputs)
 
+    ir_key = _ir_digest(ir)
     results: Dict[str, Any] = {}
     for t in targets:
         if t == "python":
-            code = gen_python(ir, module_name=program_path.stem)
+            code = _codegen(f"python-{program_path.stem}", lambda: gen_python(ir, module_name=program_path.stem), ir_key, cache_dir)
             obs, perr = _run_python_generated(code, inputs)
             if perr:
                 results[t] = {"status":"fail", "reason": perr}
@@ -137,7 +279,7 @@ def run_equivalence(program_path: Path, targets: List[str], level: int, inputs:
             }
         elif t == "wasm":
             try:
-                wat, notes = gen_wat(ir)
+                wat, notes = _codegen("wasm", lambda: gen_wat(ir), ir_key, cache_dir)
                 results[t] = {
                     "status": "degraded",
                     "degradation": "WASM backend is snapshot-only in this toolchain; no runtime executor wired. Validated codegen determinism only.",
@@ -151,7 +293,7 @@ def run_equivalence(program_path: Path, targets: List[str], level: int, inputs:
                 }
         elif t == "sql":
             try:
-                sql, notes = gen_sql(ir)
+                sql, notes = _codegen("sql", lambda: gen_sql(ir), ir_key, cache_dir)
                 results[t] = {
                     "status": "degraded",
                     "degradation": "SQL is non-executable in oracle; validated codegen only (set-based semantics require DB runtime).",
@@ -161,7 +303,7 @@ def run_equivalence(program_path: Path, targets: List[str], level: int, inputs:
                 results[t] = {"status":"degraded", "degradation":"SQL backend declined this program (subset limit).", "error": str(e)}
         elif t == "html":
             try:
-                html, notes = gen_html(ir)
+                html, notes = _codegen("html", lambda: gen_html(ir), ir_key, cache_dir)
                 results[t] = {
                     "status": "degraded",
                     "degradation": "HTML is UI snapshot; not an executable semantics target. Validated codegen only.",
@@ -208,6 +350,23 @@ def feature_target_matrix(reports: List[Dict[str, Any]], targets: List[str]) ->
     return matrix
 
 
+# Below this many programs the pool's start-up costs more than it saves.
+_PARALLEL_MIN_PROGRAMS = 8
+
+
+def run_all(program_paths: List[Path], targets: List[str], level: int, inputs: Optional[List[str]] = None, enforce_caps: bool = False, cache_dir: Optional[Path] = None, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """run_equivalence over every program, in order. Programs are independent,
+    so larger batches are spread over a process pool (`workers` defaults to
+    os.cpu_count(); 1 runs everything in-process)."""
+    run = functools.partial(run_equivalence, targets=targets, level=level, inputs=inputs, enforce_caps=enforce_caps, cache_dir=cache_dir)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(program_paths) < _PARALLEL_MIN_PROGRAMS:
+        return [run(p) for p in program_paths]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        return list(ex.map(run, program_paths, chunksize=max(1, len(program_paths) // (workers * 4))))
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     ap = argparse.ArgumentParser(description="HAND equivalence oracle (interpreter as ground truth)")
     ap.add_argument("inputs", nargs="+", help="Input .hand programs")
@@ -216,6 +375,8 @@ def main(argv: Optional[List[str]] = None) -> int:
     ap.add_argument("--enforce-capabilities", action="store_true", help="enforce declared/required capabilities (may cause compile errors)")
     ap.add_argument("--inputs-json", default=None, help="JSON list of inputs for ask(), applied to all programs")
     ap.add_argument("--out", default="equivalence_report.json", help="Output report path")
+    ap.add_argument("--cache-dir", default=None, help="Cache front-end results (AST/IR) and per-backend generated code under this directory, keyed by the handc sources digest")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes for large batches (default: CPU count; 1 = serial)")
     args = ap.parse_args(argv)
 
     targets=[t.strip() for t in args.targets.split(",") if t.strip()]
@@ -227,9 +388,8 @@ def main(argv: Optional[List[str]] = None) -> int:
     if args.inputs_json:
         inputs=json.loads(args.inputs_json)
 
-    reports=[]
-    for p in args.inputs:
-        reports.append(run_equivalence(Path(p), targets, level=args.level, inputs=inputs, enforce_caps=args.enforce_capabilities))
+    cache_dir=Path(args.cache_dir) if args.cache_dir else None
+    reports=run_all([Path(p) for p in args.inputs], targets, level=args.level, inputs=inputs, enforce_caps=args.enforce_capabilities, cache_dir=cache_dir, workers=args.workers)
 
     matrix=feature_target_matrix(reports, targets)
     out={"schema_version":"0.1","observational_equivalence":"Ω + Σ (top-level store) for executable subset", "targets":targets, "reports":reports, "matrix":matrix}
@@ -81,13 +81,16 @@ class OutputTrace:
 # -------------------------
 
 class Interpreter:
-    def __init__(self, *, inputs: Optional[List[str]]=None, max_steps: int=200_000, max_loop_iters: int=1_000_000):
+    def __init__(self, *, inputs: Optional[List[str]]=None, max_steps: int=200_000, max_loop_iters: int=1_000_000, record_trace: bool=True):
+        # record_trace=False keeps only Ω/Σ: steps are still counted (the step limit
+        # applies), but no events are kept and no trace.json is written.
         self.inputs=list(inputs or [])
         self.input_i=0
         self.max_steps=max_steps
         self.max_loop_iters=max_loop_iters
 
         self.step=0
+        self.record_trace=record_trace
         self.trace: List[TraceEvent]=[]
         self.outputs: List[str]=[]
 
@@ -98,7 +101,8 @@ class Interpreter:
         self.step += 1
         if self.step > self.max_steps:
             raise HandRuntimeError("HND-RT-9999", "Step limit exceeded (possible infinite loop).")
-        self.trace.append(TraceEvent(step=self.step, kind=kind, detail=detail))
+        if self.record_trace:
+            self.trace.append(TraceEvent(step=self.step, kind=kind, detail=detail))
 
     # --------
     # IO
@@ -391,6 +395,8 @@ class Interpreter:
         return {}
 
     def _finalize(self) -> RunResult:
+        if not self.record_trace:
+            return RunResult(outputs=self.outputs, final_store=self.store_snapshot(), trace=self.trace, trace_path="")
         # write trace to a deterministic json file next to cwd (caller can override by copying)
         trace_path=str(pathlib.Path("trace.json").absolute())
         with open(trace_path, "w", encoding="utf-8") as f:
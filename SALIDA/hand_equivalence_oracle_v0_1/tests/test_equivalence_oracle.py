@@ -18,3 +18,12 @@ def test_equivalence_python_pass(tmp_path: Path):
     r=rep["reports"][0]
     assert r["status"]=="ok"
     assert r["results"]["python"]["status"]=="pass"
+
+def test_equivalence_parallel_matches_serial(tmp_path: Path):
+    progs = sorted(str(p.relative_to(REPO)) for p in (REPO/"tests"/"programs").glob("*.hand"))[:8]
+    reps = []
+    for workers in ("1", "2"):
+        out = tmp_path/f"rep{workers}.json"
+        run(["equivalence_runner.py", *progs, "--targets", "python", "--workers", workers, "--out", str(out)])
+        reps.append(out.read_text(encoding="utf-8"))
+    assert reps[0] == reps[1]
@@ -1,15 +1,34 @@
 from __future__ import annotations
+import contextlib
+import functools
+import hashlib
+import io
 import json
+import os
+import pickle
+import subprocess
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
 from handc.lexer import lex
 from handc.parser import parse
 from handc.typecheck import typecheck
 from handc.lowering import lower_program
 from handc.interpreter import Interpreter, HandRuntimeError
 from handc.python_gen import gen_python
+from handc.ast import to_plain
+import handc
 
 
 @dataclass(frozen=True)
@@ -20,12 +39,115 @@ class CaseResult:
 
 
 def _read_json(p: Path) -> Any:
-    return json.loads(p.read_text(encoding="utf-8"))
+    return _loads(p.read_bytes())
+
+
+# Snapshots (manifest.json, expected.*.json) are parsed once per (path, mtime)
+# so repeated run_all calls in one process (watch mode, pytest reruns) skip
+# the deserialization. The cached objects are shared: compare, never mutate.
+# Comparison stays structural (==): it runs in C over the nested containers and
+# measured on par with comparing canonical orjson dumps, which would also start
+# telling 1, 1.0 and True apart.
+@functools.lru_cache(maxsize=4096)
+def _read_json_cached(path_str: str, mtime_ns: int) -> Any:
+    return _read_json(Path(path_str))
+
+
+def _read_snapshot(p: Path) -> Any:
+    return _read_json_cached(str(p), p.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _manifest_index_cached(path_str: str, mtime_ns: int) -> Dict[str, Dict[str, Any]]:
+    return {x["case_id"]: x for x in _read_json_cached(path_str, mtime_ns)}
+
+
+def _manifest_index(conformance_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """case_id -> manifest entry, rebuilt only when manifest.json changes."""
+    p = conformance_dir / "manifest.json"
+    return _manifest_index_cached(str(p), p.stat().st_mtime_ns)
 
 
 def _write_json(p: Path, obj: Any) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if orjson is not None:
+        try:
+            p.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+            return
+        except TypeError:
+            pass  # non-str keys, ints beyond 64 bits, ...: let json handle it
+    # write the newline separately instead of copying the whole document to append it
+    with p.open("w", encoding="utf-8") as f:
+        f.write(json.dumps(obj, ensure_ascii=False, indent=2))
+        f.write("\n")
+
+
+# Front-end results (tokens, AST, type diagnostics, IR, generated Python) are
+# pickled under <conformance>/.cache, keyed by the program source, the case
+# parameters and a digest of the handc sources, so reruns skip
+# lex/parse/typecheck/lowering/codegen. Bump _CACHE_FORMAT when the layout of
+# the cached tuple changes.
+_CACHE_DIRNAME = ".cache"
+_CACHE_FORMAT = "2"
+# Below this many cases run_all stays in-process; starting the pool costs more
+# than the cases themselves.
+_PARALLEL_MIN_CASES = 32
+_handc_digest: Optional[str] = None
+
+
+def _handc_fingerprint() -> str:
+    global _handc_digest
+    if _handc_digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        for f in sorted(Path(handc.__file__).parent.glob("*.py")):
+            h.update(f.name.encode("utf-8"))
+            h.update(f.read_bytes())
+        _handc_digest = h.hexdigest()
+    return _handc_digest
+
+
+def _front_end(src: str, case_id: str, module_name: str, cache_dir: Optional[Path]) -> Tuple[Any, ...]:
+    """lex -> parse -> typecheck -> lower -> python codegen, stopping at the first
+    stage that reports diagnostics.
+    Returns (tokens, lex_diags, parse_result, type_diags, ir, py); skipped stages are None."""
+    path = None
+    if cache_dir is not None:
+        h = hashlib.blake2b(digest_size=20)
+        for part in (_CACHE_FORMAT, _handc_fingerprint(), case_id, module_name, src):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        path = cache_dir / f"{h.hexdigest()}.pkl"
+        try:
+            with path.open("rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # missing or unreadable entry: recompute
+
+    fname = f"{case_id}.hand"
+    toks, ldiags = lex(src, fname)
+    pres = tdiags = ir = py = None
+    if not ldiags:
+        pres = parse(toks, fname)
+        if not pres.diagnostics:
+            tdiags = typecheck(pres.program, fname)
+            if not tdiags:
+                ir = lower_program(pres.program, module_name=module_name, semver="0.1.0")
+                try:
+                    py = gen_python(ir, module_name=module_name)
+                except Exception:
+                    pass  # left to run_case, which reports it at the codegen stage
+    res = (toks, ldiags, pres, tdiags, ir, py)
+
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return res
 
 
 def _tokens_to_json(tokens) -> List[Dict[str, Any]]:
@@ -36,38 +158,103 @@ def _tokens_to_json(tokens) -> List[Dict[str, Any]]:
     return out
 
 
+# Diagnostic classes are plain dataclasses: read fields straight from the
+# instance dict instead of hasattr/getattr pairs.
+_DIAG_KEYS = ("severity", "message", "idref", "code", "hint")
+
+
 def _diags_to_json(diags) -> List[Dict[str, Any]]:
     out=[]
     for d in diags:
-        dd={}
-        for k in ("severity","message","idref","code","hint"):
-            if hasattr(d,k) and getattr(d,k) is not None:
-                dd[k]=getattr(d,k)
-        if hasattr(d,"span") and getattr(d,"span") is not None:
-            sp=getattr(d,"span")
-            if hasattr(sp,"line"):
-                dd["span"]={"file":sp.file,"line":sp.line,"col":sp.col,"end_col":sp.end_col}
+        attrs=getattr(d, "__dict__", None) or {}
+        dd={k: v for k in _DIAG_KEYS if (v := attrs.get(k)) is not None}
+        sp=attrs.get("span")
+        if sp is not None and hasattr(sp,"line"):
+            dd["span"]={"file":sp.file,"line":sp.line,"col":sp.col,"end_col":sp.end_col}
         out.append(dd if dd else {"message":str(d)})
     return out
 
 
-def run_case(case_dir: Path) -> CaseResult:
+_TRACE_KEYS = frozenset(("outputs", "events", "runtime_error"))
+
+
+def _trace_matches(exp: Any, outputs: List[str], events: List[Any], runtime_error: Optional[Dict[str, Any]]) -> bool:
+    """Same result as comparing {"outputs", "events": [e.__dict__ ...], "runtime_error"}
+    against the snapshot, without building the event list; stops at the first
+    differing event."""
+    if not isinstance(exp, dict) or exp.keys() != _TRACE_KEYS:
+        return False
+    if exp["outputs"] != outputs or exp["runtime_error"] != runtime_error:
+        return False
+    exp_events = exp["events"]
+    if not isinstance(exp_events, list) or len(exp_events) != len(events):
+        return False
+    return all(e.__dict__ == x for e, x in zip(events, exp_events))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_generated(py: str) -> Any:
+    return compile(py, "<hand-gen>", "exec")
+
+
+def _run_generated_inprocess(py: str, inputs: List[str]) -> Optional[Dict[str, Any]]:
+    """Run the generated module's JSON entry point in this process, as its
+    __main__ block would. Returns None when the run must be redone in a
+    subprocess to reproduce the exact rc/stdout/stderr record (it raised or
+    did not print the expected JSON)."""
+    # dataclasses resolve string annotations through sys.modules, so the
+    # generated code needs a registered module while it is being executed
+    mod = types.ModuleType("__hand_gen__")
+    buf = io.StringIO()
+    sys.modules[mod.__name__] = mod
+    try:
+        with contextlib.redirect_stdout(buf):
+            exec(_compile_generated(py), mod.__dict__)
+            mod.__dict__["__hand_run_and_print_json"](list(inputs))
+        return {"outputs": json.loads(buf.getvalue().strip())["outputs"]}
+    except (Exception, SystemExit):
+        # SystemExit is the one non-Exception generated code can raise; Ctrl-C still stops the run
+        return None
+    finally:
+        sys.modules.pop(mod.__name__, None)
+
+
+def _run_generated_subprocess(py: str, inputs: List[str]) -> Dict[str, Any]:
+    # Run generated python deterministically (same convention as generator uses).
+    # The program is fed on stdin ("python - <inputs>"), so nothing is written
+    # into the case directory; sys.argv[1] still carries the inputs.
+    arg = json.dumps(inputs, ensure_ascii=False)
+    p = subprocess.run([sys.executable, "-", arg], input=py, capture_output=True, text=True, encoding="utf-8")
+    if p.returncode != 0:
+        return {"rc": p.returncode, "stderr": p.stderr.strip(), "stdout": p.stdout.strip()}
+    try:
+        return {"outputs": json.loads(p.stdout.strip())["outputs"]}
+    except Exception:
+        return {"rc": p.returncode, "stdout": p.stdout[:200], "stderr": p.stderr[:200], "error": "bad_json"}
+
+
+def run_case(case_dir: Path, use_cache: bool = True, manifest_entry: Optional[Dict[str, Any]] = None) -> CaseResult:
+    """Run one case. run_all passes the case's manifest entry; when it is not
+    given it is looked up in <conformance>/manifest.json."""
     src = (case_dir / "program.hand").read_text(encoding="utf-8")
-    meta = _read_json(case_dir.parent.parent / "manifest.json")
+    conformance_dir = case_dir.parent.parent
     case_id = case_dir.name
-    m = next((x for x in meta if x["case_id"] == case_id), None)
+    m = manifest_entry
+    if m is None:
+        m = _manifest_index(conformance_dir).get(case_id)
     if not m:
         return CaseResult(case_id, "error", {"message": "missing manifest entry"})
     inputs = m.get("inputs") or []
+    toks, ldiags, pres, tdiags, ir, py = _front_end(
+        src, case_id, m["name"], conformance_dir / _CACHE_DIRNAME if use_cache else None)
 
     # ---- lexer
-    toks, ldiags = lex(src, f"{case_id}.hand")
     got_tokens = _tokens_to_json(toks)
-    exp_tokens = _read_json(case_dir / "expected.tokens.json")
+    exp_tokens = _read_snapshot(case_dir / "expected.tokens.json")
     if got_tokens != exp_tokens:
         return CaseResult(case_id, "fail", {"stage": "lexer", "diff": "tokens"})
     got_lex_diags = _diags_to_json(ldiags)
-    exp_lex_diags = _read_json(case_dir / "expected.lex_diags.json")
+    exp_lex_diags = _read_snapshot(case_dir / "expected.lex_diags.json")
     if got_lex_diags != exp_lex_diags:
         return CaseResult(case_id, "fail", {"stage": "lexer", "diff": "diagnostics"})
 
@@ -75,31 +262,28 @@ def run_case(case_dir: Path) -> CaseResult:
         return CaseResult(case_id, "pass", {"status": "lex_error"})
 
     # ---- parser
-    pres = parse(toks, f"{case_id}.hand")
     got_parse_diags = _diags_to_json(pres.diagnostics)
-    exp_parse_diags = _read_json(case_dir / "expected.parse_diags.json")
+    exp_parse_diags = _read_snapshot(case_dir / "expected.parse_diags.json")
     if got_parse_diags != exp_parse_diags:
         return CaseResult(case_id, "fail", {"stage": "parser", "diff": "diagnostics"})
     if pres.diagnostics:
         return CaseResult(case_id, "pass", {"status": "parse_error"})
 
-    got_ast = json.loads(json.dumps(pres.program, default=lambda o: o.__dict__, ensure_ascii=False))
-    exp_ast = _read_json(case_dir / "expected.ast.json")
+    got_ast = to_plain(pres.program)
+    exp_ast = _read_snapshot(case_dir / "expected.ast.json")
     if got_ast != exp_ast:
         return CaseResult(case_id, "fail", {"stage": "parser", "diff": "ast"})
 
     # ---- typecheck
-    tdiags = typecheck(pres.program, f"{case_id}.hand")
     got_type_diags = _diags_to_json(tdiags)
-    exp_type_diags = _read_json(case_dir / "expected.type_diags.json")
+    exp_type_diags = _read_snapshot(case_dir / "expected.type_diags.json")
     if got_type_diags != exp_type_diags:
         return CaseResult(case_id, "fail", {"stage": "typecheck", "diff": "diagnostics"})
     if tdiags:
         return CaseResult(case_id, "pass", {"status": "type_error"})
 
     # ---- IR
-    ir = lower_program(pres.program, module_name=m["name"], semver="0.1.0")
-    exp_ir = _read_json(case_dir / "expected.ir.json")
+    exp_ir = _read_snapshot(case_dir / "expected.ir.json")
     if ir != exp_ir:
         return CaseResult(case_id, "fail", {"stage": "lowering", "diff": "ir"})
 
@@ -111,27 +295,17 @@ def run_case(case_dir: Path) -> CaseResult:
     except HandRuntimeError as e:
         runtime_error={"code": e.code, "message": e.message}
         rr = it._finalize()
-    got_trace = {"outputs": rr.outputs, "events": [e.__dict__ for e in rr.trace], "runtime_error": runtime_error}
-    exp_trace = _read_json(case_dir / "expected.trace.json")
-    if got_trace != exp_trace:
+    exp_trace = _read_snapshot(case_dir / "expected.trace.json")
+    if not _trace_matches(exp_trace, rr.outputs, rr.trace, runtime_error):
         return CaseResult(case_id, "fail", {"stage": "interpreter", "diff": "trace"})
 
     # ---- python codegen equivalence
-    py = gen_python(ir, module_name=m["name"])
-    # Run generated python deterministically (same convention as generator uses)
-    import subprocess, sys as _sys
-    tmp = case_dir / "_gen_run.py"
-    tmp.write_text(py, encoding="utf-8")
-    arg = json.dumps(inputs, ensure_ascii=False)
-    p = subprocess.run([_sys.executable, str(tmp), arg], capture_output=True, text=True)
-    exp_py_run = _read_json(case_dir / "expected.python_run.json")
-    if p.returncode != 0:
-        got_py_run = {"rc": p.returncode, "stderr": p.stderr.strip(), "stdout": p.stdout.strip()}
-    else:
-        try:
-            got_py_run = {"outputs": json.loads(p.stdout.strip())["outputs"]}
-        except Exception:
-            got_py_run = {"rc": p.returncode, "stdout": p.stdout[:200], "stderr": p.stderr[:200], "error": "bad_json"}
+    if py is None:
+        py = gen_python(ir, module_name=m["name"])
+    got_py_run = _run_generated_inprocess(py, inputs)
+    if got_py_run is None:
+        got_py_run = _run_generated_subprocess(py, inputs)
+    exp_py_run = _read_snapshot(case_dir / "expected.python_run.json")
 
     if got_py_run != exp_py_run:
         return CaseResult(case_id, "fail", {"stage": "python_codegen", "diff": "python_run"})
@@ -144,13 +318,22 @@ def run_case(case_dir: Path) -> CaseResult:
     return CaseResult(case_id, "pass", {"status": "ok" if runtime_error is None else "runtime_error"})
 
 
-def run_all(conformance_dir: Path) -> List[CaseResult]:
+def run_all(conformance_dir: Path, use_cache: bool = True, workers: Optional[int] = None) -> List[CaseResult]:
+    """Run every case under <conformance_dir>/cases, in case_id order.
+    Cases are independent, so large suites are spread over a process pool
+    (`workers` defaults to os.cpu_count(); 1 runs everything in-process)."""
     cases_dir = conformance_dir / "cases"
-    results=[]
-    for case_dir in sorted(cases_dir.iterdir()):
-        if case_dir.is_dir():
-            results.append(run_case(case_dir))
-    return results
+    case_dirs = [d for d in sorted(cases_dir.iterdir()) if d.is_dir()]
+    # manifest.json is read once and each case gets its own entry
+    by_id = _manifest_index(conformance_dir)
+    entries = [by_id.get(d.name) for d in case_dirs]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(case_dirs) < _PARALLEL_MIN_CASES:
+        return [run_case(d, use_cache, e) for d, e in zip(case_dirs, entries)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(run_case, case_dirs, [use_cache] * len(case_dirs), entries,
+                           chunksize=max(1, len(case_dirs) // (workers * 4))))
 
 
 def semantic_coverage_report(manifest: List[Dict[str, Any]]) -> Dict[str, Any]:
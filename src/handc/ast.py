@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Optional, Union
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, List, Optional, Union
 
 # ---- Program ----
 
@@ -119,3 +119,24 @@ class Call:
 @dataclass(frozen=True)
 class Paren:
     expr: Expr
+
+# ---- Plain-data view ----
+
+_SCALARS = (str, int, float, bool, type(None))
+
+def to_plain(o: Any) -> Any:
+    """Convert AST dataclasses (and lists/tuples/dicts of them) into dicts and
+    lists of primitives in one pass: the shape a JSON dump of the tree has,
+    without serializing it. Other leaf values are returned unchanged."""
+    if isinstance(o, _SCALARS):
+        return o
+    if isinstance(o, (list, tuple)):
+        return [to_plain(x) for x in o]
+    if isinstance(o, dict):
+        return {k: to_plain(v) for k, v in o.items()}
+    if is_dataclass(o) and not isinstance(o, type):
+        d = getattr(o, "__dict__", None)
+        if d is None:
+            return {f.name: to_plain(getattr(o, f.name)) for f in fields(o)}
+        return {k: to_plain(v) for k, v in d.items()}
+    return o
@@ -1,8 +1,11 @@
 from __future__ import annotations
+import sys
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
-CANON_CAPS: Set[str] = {
+# Capability names are interned so that lookups against strings coming from
+# parsed IR (see normalize_caps) hash once and compare by identity.
+CANON_CAPS: FrozenSet[str] = frozenset(sys.intern(c) for c in {
     "compute",
     "io.read",
     "io.write",
@@ -11,38 +14,39 @@ CANON_CAPS: Set[str] = {
     "net",
     "env",
     "crypto",
-}
+})
+CANON_CAPS_SORTED: Tuple[str, ...] = tuple(sorted(CANON_CAPS))
 
 @dataclass(frozen=True)
 class CapPolicy:
-    allowed_without_approval: Set[str]
-    allowed_with_approval: Set[str]
-    denied: Set[str]
+    allowed_without_approval: FrozenSet[str]
+    allowed_with_approval: FrozenSet[str]
+    denied: FrozenSet[str]
 
 POLICY: Dict[int, CapPolicy] = {
     1: CapPolicy(
-        allowed_without_approval={"compute"},
-        allowed_with_approval=set(),
+        allowed_without_approval=frozenset({"compute"}),
+        allowed_with_approval=frozenset(),
         denied=CANON_CAPS - {"compute"},
     ),
     2: CapPolicy(
-        allowed_without_approval={"compute", "io.write"},
-        allowed_with_approval={"io.read"},
+        allowed_without_approval=frozenset({"compute", "io.write"}),
+        allowed_with_approval=frozenset({"io.read"}),
         denied=CANON_CAPS - {"compute", "io.write", "io.read"},
     ),
     3: CapPolicy(
-        allowed_without_approval={"compute", "io.read", "io.write"},
-        allowed_with_approval={"fs.read", "fs.write", "net"},
+        allowed_without_approval=frozenset({"compute", "io.read", "io.write"}),
+        allowed_with_approval=frozenset({"fs.read", "fs.write", "net"}),
         denied=CANON_CAPS - {"compute", "io.read", "io.write", "fs.read", "fs.write", "net"},
     ),
     4: CapPolicy(
-        allowed_without_approval={"compute", "io.read", "io.write", "fs.read"},
-        allowed_with_approval={"fs.write", "net", "env", "crypto"},
-        denied=set(),
+        allowed_without_approval=frozenset({"compute", "io.read", "io.write", "fs.read"}),
+        allowed_with_approval=frozenset({"fs.write", "net", "env", "crypto"}),
+        denied=frozenset(),
     ),
 }
 
-EFFECT_TO_CAP: Dict[str, str] = {
+EFFECT_TO_CAP: Dict[str, str] = {sys.intern(k): sys.intern(v) for k, v in {
     "io.show": "io.write",
     "io.ask": "io.read",
     "contract.verify": "compute",
@@ -52,14 +56,19 @@ EFFECT_TO_CAP: Dict[str, str] = {
     "net.request": "net",
     "env.read": "env",
     "crypto.use": "crypto",
-}
+}.items()}
+
+def add_caps_for_effects(effects: Optional[Iterable[str]], req: Set[str]) -> None:
+    """Add the capabilities required by `effects` to `req` in place."""
+    effect_to_cap=EFFECT_TO_CAP
+    for ef in effects or ():
+        cap=effect_to_cap.get(ef)
+        if cap is not None:
+            req.add(cap)
 
 def caps_required_for_effects(effects: List[str]) -> Set[str]:
     req={"compute"}
-    for ef in effects or []:
-        cap=EFFECT_TO_CAP.get(ef)
-        if cap:
-            req.add(cap)
+    add_caps_for_effects(effects, req)
     return req
 
 def normalize_caps(caps: Optional[List[str]]) -> List[str]:
@@ -68,6 +77,8 @@ def normalize_caps(caps: Optional[List[str]]) -> List[str]:
     out=[]
     seen=set()
     for c in caps:
+        if isinstance(c, str):
+            c=sys.intern(c)
         if c not in seen:
             out.append(c)
             seen.add(c)
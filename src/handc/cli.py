@@ -1,10 +1,16 @@
 from __future__ import annotations
 import argparse
 import json
-from dataclasses import asdict, is_dataclass
+from dataclasses import is_dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .ast import to_plain
 from .lexer import lex
 from .parser import parse
 from .typecheck import typecheck
@@ -58,64 +64,67 @@ def _emit_trace_from_codegen(target: str, out_file: str, code: str, actor: str,
 
 def _json_default(obj: Any):
     if is_dataclass(obj):
-        return asdict(obj)
+        return to_plain(obj)
     if hasattr(obj, "to_json"):
         return obj.to_json()
     return str(obj)
 
+# Diagnostics and notes are plain dataclasses: read fields straight from the
+# instance dict instead of hasattr/getattr pairs.
+_DIAG_KEYS = ("severity", "message", "idref", "code", "hint")
+_SPAN_KEYS = ("filename", "start_line", "start_col", "end_line", "end_col")
+_NOTE_KEYS = ("kind", "code", "message", "origin_ref")
+
 def _diag_to_dict(d: Any) -> Dict[str, Any]:
     # lexer/parser/typechecker diagnostics share fields: severity, message, idref?, span?
-    out: Dict[str, Any] = {}
-    for k in ("severity","message","idref","code","hint"):
-        if hasattr(d, k):
-            v = getattr(d, k)
-            if v is not None:
-                out[k] = v
+    attrs = getattr(d, "__dict__", None) or {}
+    out: Dict[str, Any] = {k: v for k in _DIAG_KEYS if (v := attrs.get(k)) is not None}
     # span/location
-    if hasattr(d, "span") and getattr(d, "span") is not None:
-        sp = getattr(d, "span")
-        out["span"] = {k:getattr(sp,k) for k in ("filename","start_line","start_col","end_line","end_col") if hasattr(sp,k)}
+    sp = attrs.get("span")
+    if sp is not None:
+        out["span"] = {k:getattr(sp,k) for k in _SPAN_KEYS if hasattr(sp,k)}
     return out if out else {"message": str(d)}
 
 def _note_to_dict(n: Any) -> Dict[str, Any]:
     if isinstance(n, dict):
         return n
-    out: Dict[str, Any] = {}
-    for k in ("kind","code","message","origin_ref"):
-        if hasattr(n, k):
-            v = getattr(n, k)
-            if v is not None:
-                out[k] = v
+    attrs = getattr(n, "__dict__", None) or {}
+    out: Dict[str, Any] = {k: v for k in _NOTE_KEYS if (v := attrs.get(k)) is not None}
     return out if out else {"message": str(n)}
 
 def _write_json(path: Path, data: Any) -> None:
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2, default=_json_default) + "\n", encoding="utf-8")
+    if orjson is not None:
+        try:
+            path.write_bytes(orjson.dumps(data, default=_json_default,
+                                          option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+            return
+        except TypeError:
+            pass  # non-str keys, ints beyond 64 bits, ...: let json handle it
+    # write the newline separately instead of copying the whole document to append it
+    with path.open("w", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False, indent=2, default=_json_default))
+        f.write("\n")
+
+# Backward-compat: early lowering may emit non-canonical shorthands ("io", "fs").
+_SHORTHAND_CAPS: Dict[str, Tuple[str, ...]] = {
+    "io": ("io.read", "io.write"),
+    "fs": ("fs.read", "fs.write"),
+}
 
 def _expand_shorthand_caps(caps: List[str]) -> List[str]:
-    # Backward-compat: early lowering may emit non-canonical shorthands ("io", "fs").
     expanded: List[str] = []
     for c in caps:
-        if c == "io":
-            expanded.extend(["io.read", "io.write"])
-        elif c == "fs":
-            expanded.extend(["fs.read", "fs.write"])
-        else:
-            expanded.append(c)
+        expanded.extend(_SHORTHAND_CAPS.get(c, (c,)))
     # stable order, unique
-    seen=set()
-    out=[]
-    for c in expanded:
-        if c not in seen:
-            out.append(c); seen.add(c)
-    return out
-
-def _target_outfile(target: str) -> str:
-    return {
-        "python": "main.py",
-        "wasm": "main.wat",
-        "sql": "main.sql",
-        "html": "index.html",
-    }[target]
+    return list(dict.fromkeys(expanded))
+
+# target -> (generator, returns (code, notes), output file name)
+_TARGETS: Dict[str, Tuple[Callable[..., Any], bool, str]] = {
+    "python": (gen_python, False, "main.py"),
+    "wasm": (gen_wat, True, "main.wat"),
+    "sql": (gen_sql, True, "main.sql"),
+    "html": (gen_html, True, "index.html"),
+}
 
 def build(
     *,
@@ -236,28 +245,19 @@ def build(
     if fatal:
         return 2, report
     # 7) codegen per target
-    out_file = out_dir / _target_outfile(target)
+    gen, has_notes, out_name = _TARGETS[target]
+    out_file = out_dir / out_name
 
     try:
-        if target == "python":
-            code = gen_python(ir2, module_name=input_path.stem)
+        if has_notes:
+            code, notes = gen(ir2)
+            report["degradations"].extend([_note_to_dict(n) for n in notes])
+            out_file.write_text(code, encoding="utf-8")
+        else:
+            code = gen(ir2, module_name=input_path.stem)
             out_file.write_text(code, encoding="utf-8")
             if emit_trace:
                 trace_events.extend(_emit_trace_from_codegen(target, str(out_file), code, origin_actor, prompt_hash))
-        elif target == "wasm":
-            wat, notes = gen_wat(ir2)
-            report["degradations"].extend([_note_to_dict(n) for n in notes])
-            out_file.write_text(wat, encoding="utf-8")
-        elif target == "sql":
-            sql, notes = gen_sql(ir2)
-            report["degradations"].extend([_note_to_dict(n) for n in notes])
-            out_file.write_text(sql, encoding="utf-8")
-        elif target == "html":
-            html, notes = gen_html(ir2)
-            report["degradations"].extend([_note_to_dict(n) for n in notes])
-            out_file.write_text(html, encoding="utf-8")
-        else:
-            raise ValueError("Unknown target")
     except (WasmGenError, SqlGenError, HtmlGenError) as e:
         # compile-time unsupported -> degradation+error
         note = getattr(e, "note", None)
@@ -275,7 +275,7 @@ def build(
 def main(argv: Optional[List[str]] = None) -> int:
     ap = argparse.ArgumentParser(prog="handc", description="HAND compiler toolchain (v0.1)")
     ap.add_argument("input", help="input .hand file")
-    ap.add_argument("--target", choices=["python","wasm","sql","html"], required=True)
+    ap.add_argument("--target", choices=list(_TARGETS), required=True)
     ap.add_argument("--out", default="dist", help="output directory")
     ap.add_argument("--level", type=int, default=2, choices=[1,2,3,4], help="supervision level 1-4")
     ap.add_argument("--emit-ir", action="store_true")
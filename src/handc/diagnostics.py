@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional, Tuple
 
 @dataclass(frozen=True)
 class SrcLoc:
@@ -8,16 +8,38 @@ class SrcLoc:
     line: int
     col: int
 
+def _render(template: str, args: Tuple[Tuple[str, Any], ...]) -> str:
+    return template.format_map(dict(args)) if args else template
+
 @dataclass(frozen=True)
 class Diagnostic:
     idref: str
     code: str
     severity: str  # "warning"|"error"|"fatal"
-    message_human: str
+    message_template: str
     src: SrcLoc
-    fix: Optional[str] = None
+    fix_template: Optional[str] = None
+    # Named values for the {placeholders} of both templates. Formatting is
+    # deferred until the text is read; reports that only need codes never pay it.
+    args: Tuple[Tuple[str, Any], ...] = ()
+
+    @property
+    def message_human(self) -> str:
+        return _render(self.message_template, self.args)
+
+    @property
+    def fix(self) -> Optional[str]:
+        if self.fix_template is None:
+            return None
+        return _render(self.fix_template, self.args)
+
+    def __repr__(self) -> str:
+        # same shape as before templates were introduced
+        return (f"Diagnostic(idref={self.idref!r}, code={self.code!r}, severity={self.severity!r}, "
+                f"message_human={self.message_human!r}, src={self.src!r}, fix={self.fix!r})")
 
     def __str__(self) -> str:
         loc = f"{self.src.file}:{self.src.line}:{self.src.col}"
-        fix = f" Fix: {self.fix}" if self.fix else ""
+        fix = self.fix
+        fix = f" Fix: {fix}" if fix else ""
         return f"[{self.severity}] {self.idref} {self.code} {loc} {self.message_human}{fix}"
@@ -1,8 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from .capabilities import CANON_CAPS, POLICY, caps_required_for_effects, normalize_caps
+from .capabilities import CANON_CAPS, CANON_CAPS_SORTED, POLICY, add_caps_for_effects, normalize_caps
+
+_EMPTY: Tuple[Any, ...] = ()
+_COMPUTE="compute"
+_IO_READ="io.read"
 
 @dataclass(frozen=True)
 class CapDiagnostic:
@@ -30,51 +34,71 @@ def _origin_ref(node: Dict[str, Any]) -> Optional[str]:
     except Exception:
         return None
 
-def _collect_required_caps_from_expr(expr: Optional[Dict[str, Any]]) -> Set[str]:
-    if not expr or not isinstance(expr, dict):
-        return {"compute"}
-    k=expr.get("kind")
-    req={"compute"}
-    if k=="call":
-        if expr.get("callee")=="ask":
-            req.add("io.read")
-        for a in expr.get("args",[]) or []:
-            req |= _collect_required_caps_from_expr(a)
-    elif k=="unary":
-        req |= _collect_required_caps_from_expr(expr.get("expr"))
-    elif k=="binary":
-        req |= _collect_required_caps_from_expr(expr.get("left"))
-        req |= _collect_required_caps_from_expr(expr.get("right"))
-    return req
+def _expr_call_caps(expr: Dict[str, Any], req: Set[str]) -> None:
+    if expr.get("callee")=="ask":
+        req.add(_IO_READ)
+    for a in expr.get("args") or _EMPTY:
+        _collect_required_caps_from_expr(a, req)
 
-def _collect_required_caps_from_stmt(stmt: Dict[str, Any]) -> Set[str]:
-    req={"compute"}
-    req |= caps_required_for_effects(stmt.get("effects",[]) or [])
-    req |= _collect_required_caps_from_expr(stmt.get("value"))
-    req |= _collect_required_caps_from_expr(stmt.get("cond"))
-    for x in stmt.get("then",[]) or []:
-        req |= _collect_required_caps_from_stmt(x)
-    for x in stmt.get("else",[]) or []:
-        req |= _collect_required_caps_from_stmt(x)
-    for x in stmt.get("body",[]) or []:
-        req |= _collect_required_caps_from_stmt(x)
-    return req
+def _expr_unary_caps(expr: Dict[str, Any], req: Set[str]) -> None:
+    _collect_required_caps_from_expr(expr.get("expr"), req)
+
+def _expr_binary_caps(expr: Dict[str, Any], req: Set[str]) -> None:
+    _collect_required_caps_from_expr(expr.get("left"), req)
+    _collect_required_caps_from_expr(expr.get("right"), req)
+
+_EXPR_CAP_HANDLERS: Dict[str, Callable[[Dict[str, Any], Set[str]], None]] = {
+    "call": _expr_call_caps,
+    "unary": _expr_unary_caps,
+    "binary": _expr_binary_caps,
+}
+
+def _collect_required_caps_from_expr(expr: Optional[Dict[str, Any]], req: Set[str]) -> None:
+    req.add(_COMPUTE)
+    if not expr or not isinstance(expr, dict):
+        return
+    h=_EXPR_CAP_HANDLERS.get(expr.get("kind"))
+    if h is not None:
+        h(expr, req)
+
+def _collect_required_caps_from_stmt(stmt: Dict[str, Any], req: Set[str]) -> None:
+    req.add(_COMPUTE)
+    add_caps_for_effects(stmt.get("effects"), req)
+    _collect_required_caps_from_expr(stmt.get("value"), req)
+    _collect_required_caps_from_expr(stmt.get("cond"), req)
+    for x in stmt.get("then") or _EMPTY:
+        _collect_required_caps_from_stmt(x, req)
+    for x in stmt.get("else") or _EMPTY:
+        _collect_required_caps_from_stmt(x, req)
+    for x in stmt.get("body") or _EMPTY:
+        _collect_required_caps_from_stmt(x, req)
+
+def _collect_required_caps_from_function(fn: Dict[str, Any], req: Set[str]) -> None:
+    req.add(_COMPUTE)
+    for st in fn.get("body") or _EMPTY:
+        _collect_required_caps_from_stmt(st, req)
+    add_caps_for_effects(fn.get("effects"), req)
 
 def required_caps_for_function(fn: Dict[str, Any]) -> Set[str]:
-    req={"compute"}
-    for st in fn.get("body",[]) or []:
-        req |= _collect_required_caps_from_stmt(st)
-    req |= caps_required_for_effects(fn.get("effects",[]) or [])
+    req={_COMPUTE}
+    _collect_required_caps_from_function(fn, req)
     return req
 
-def required_caps_for_module(ir: Dict[str, Any]) -> Set[str]:
-    req={"compute"}
+def _walk_module(ir: Dict[str, Any]) -> Tuple[Set[str], List[Tuple[Dict[str, Any], Set[str]]]]:
+    """Single traversal: module-wide union plus each function's own requirements."""
+    req={_COMPUTE}
     mod=ir["module"]
-    for st in mod.get("toplevel",[]) or []:
-        req |= _collect_required_caps_from_stmt(st)
-    for fn in mod.get("functions",[]) or []:
-        req |= required_caps_for_function(fn)
-    return req
+    for st in mod.get("toplevel") or _EMPTY:
+        _collect_required_caps_from_stmt(st, req)
+    per_fn: List[Tuple[Dict[str, Any], Set[str]]]=[]
+    for fn in mod.get("functions") or _EMPTY:
+        fn_req=required_caps_for_function(fn)
+        req |= fn_req
+        per_fn.append((fn, fn_req))
+    return req, per_fn
+
+def required_caps_for_module(ir: Dict[str, Any]) -> Set[str]:
+    return _walk_module(ir)[0]
 
 def enforce_capabilities(
     ir: Dict[str, Any],
@@ -91,8 +115,9 @@ def enforce_capabilities(
     diags: List[CapDiagnostic]=[]
 
     mod=ir.get("module",{})
+    mod_origin=_origin_ref(mod) or _origin_ref(ir)
     declared_mod=set(normalize_caps(mod.get("capabilities")))
-    declared_mod.add("compute")
+    declared_mod.add(_COMPUTE)
 
     def fail(code: str, msg: str, remediation: str, origin: Optional[str]):
         raise CapabilityError(CapDiagnostic(
@@ -105,11 +130,18 @@ def enforce_capabilities(
             fail(
                 "HND-CAP-0001",
                 f"Unknown capability '{c}' (no synonyms allowed).",
-                f"Replace '{c}' with a canonical capability: {sorted(CANON_CAPS)}.",
-                _origin_ref(mod) or _origin_ref(ir),
+                f"Replace '{c}' with a canonical capability: {list(CANON_CAPS_SORTED)}.",
+                mod_origin,
             )
 
-    required_all=required_caps_for_module(ir)
+    # Everything a program can require is canonical. If the module declares all
+    # of it and the policy neither denies nor withholds approval for any of it
+    # (level 4 with full approvals), no module-scope check can fail: skip the walk.
+    if (scope == "module" and declared_mod >= CANON_CAPS and not (CANON_CAPS & pol.denied)
+            and pol.allowed_with_approval <= approvals):
+        return ir, diags
+
+    required_all, required_per_fn=_walk_module(ir)
 
     missing=sorted(required_all - declared_mod)
     if missing:
@@ -117,51 +149,55 @@ def enforce_capabilities(
             "HND-CAP-0201",
             f"Missing declared capabilities {missing}. Program requires them but module.capabilities does not permit them.",
             "Add the missing capabilities to module.capabilities (or remove the operations requiring them).",
-            _origin_ref(mod) or _origin_ref(ir),
+            mod_origin,
         )
 
-    def check_cap(cap: str, origin: Optional[str]):
-        if cap in pol.denied:
+    def check_caps(required: Set[str], origin: Optional[str]):
+        # Both policy checks are single set intersections; the first offending
+        # capability (in sorted order) decides which diagnostic is raised.
+        denied=required & pol.denied
+        needs_approval=(required & pol.allowed_with_approval) - approvals
+        if not denied and not needs_approval:
+            return
+        cap=min(denied | needs_approval)
+        if cap in denied:
             fail(
                 "HND-CAP-0101",
                 f"Capability '{cap}' is denied at supervision level {supervision_level}.",
                 "Increase supervision level or remove the operation requiring this capability.",
                 origin,
             )
-        if cap in pol.allowed_with_approval and cap not in approvals:
-            fail(
-                "HND-CAP-0102",
-                f"Capability '{cap}' requires explicit human approval (🔴) at supervision level {supervision_level}.",
-                f"Provide approval for '{cap}', or refactor to avoid requiring it.",
-                origin,
-            )
+        fail(
+            "HND-CAP-0102",
+            f"Capability '{cap}' requires explicit human approval (🔴) at supervision level {supervision_level}.",
+            f"Provide approval for '{cap}', or refactor to avoid requiring it.",
+            origin,
+        )
 
-    for cap in sorted(required_all):
-        check_cap(cap, _origin_ref(mod) or _origin_ref(ir))
+    check_caps(required_all, mod_origin)
 
     if scope == "function":
-        for fn in mod.get("functions",[]) or []:
+        for fn, required_fn in required_per_fn:
+            fn_origin=_origin_ref(fn)
             declared_fn=set(normalize_caps(fn.get("capabilities")))
-            declared_fn.add("compute")
+            declared_fn.add(_COMPUTE)
             for c in list(declared_fn):
                 if c not in CANON_CAPS:
                     fail(
                         "HND-CAP-0001",
                         f"Unknown capability '{c}' (no synonyms allowed).",
-                        f"Replace '{c}' with a canonical capability: {sorted(CANON_CAPS)}.",
-                        _origin_ref(fn),
+                        f"Replace '{c}' with a canonical capability: {list(CANON_CAPS_SORTED)}.",
+                        fn_origin,
                     )
 
-            required_fn=required_caps_for_function(fn)
             missing_fn=sorted(required_fn - declared_fn)
             if missing_fn:
                 fail(
                     "HND-CAP-0202",
                     f"Function '{fn.get('name')}' is missing declared capabilities {missing_fn}.",
                     "Add missing caps to function.capabilities or remove the operations requiring them.",
-                    _origin_ref(fn),
+                    fn_origin,
                 )
-            for cap in sorted(required_fn):
-                check_cap(cap, _origin_ref(fn))
+            check_caps(required_fn, fn_origin)
 
     return ir, diags
@@ -1,9 +1,16 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
-from typing import Any, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import functools
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import json
+import operator
 import pathlib
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .lexer import lex
 from .parser import parse
 from . import ast as A
@@ -43,33 +50,57 @@ class _ReturnSignal(Exception):
 # Environment / Store (Σ)
 # -------------------------
 
+_UNBOUND = object()
+
 @dataclass
 class Store:
-    # Σ: mutable variable bindings per scope stack (each frame is a dict)
-    frames: List[Dict[str, Any]]
+    # Σ: variable bindings of the scope stack, kept flat. `vars` maps every visible
+    # name to its innermost binding, so a read is one dict probe at any depth;
+    # `saved` has one dict per pushed scope holding the bindings its declarations
+    # shadowed (_UNBOUND when the name was new), which pop() puts back.
+    vars: Dict[str, Any]
+    saved: List[Dict[str, Any]]
 
     def get(self, name: str) -> Any:
-        for fr in reversed(self.frames):
-            if name in fr:
-                return fr[name]
-        raise HandRuntimeError("HND-RT-0001", f"Undefined variable '{name}'.")
+        v=self.vars.get(name, _UNBOUND)
+        if v is _UNBOUND:
+            raise HandRuntimeError("HND-RT-0001", f"Undefined variable '{name}'.")
+        return v
 
     def set(self, name: str, value: Any) -> None:
         # assign to nearest existing binding, else create in top frame
-        for fr in reversed(self.frames):
-            if name in fr:
-                fr[name]=value
-                return
-        self.frames[-1][name]=value
+        if name in self.vars:
+            self.vars[name]=value
+        else:
+            self.declare(name, value)
 
     def declare(self, name: str, value: Any) -> None:
-        self.frames[-1][name]=value
+        if self.saved:
+            fr=self.saved[-1]
+            if name not in fr:
+                fr[name]=self.vars.get(name, _UNBOUND)
+        self.vars[name]=value
 
     def push(self) -> None:
-        self.frames.append({})
+        self.saved.append({})
 
     def pop(self) -> None:
-        self.frames.pop()
+        for name, old in self.saved.pop().items():
+            if old is _UNBOUND:
+                del self.vars[name]
+            else:
+                self.vars[name]=old
+
+    def global_frame(self) -> Dict[str, Any]:
+        # the outermost scope's bindings: undo every open scope on a copy
+        g=dict(self.vars)
+        for fr in reversed(self.saved):
+            for name, old in fr.items():
+                if old is _UNBOUND:
+                    del g[name]
+                else:
+                    g[name]=old
+        return g
 
 @dataclass
 class OutputTrace:
@@ -80,25 +111,100 @@ class OutputTrace:
 # Interpreter
 # -------------------------
 
+# Text literal escapes (see Interpreter._unescape_string)
+_ESCAPES: Dict[str, str] = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+
+# Binary operators: one handler per op, looked up once per evaluation. Exact
+# int/float operands go straight to the operator; anything else (bool, Text,
+# subclasses) takes the v0.1 type rules with their original diagnostics.
+def _arith(op: str, fn: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    def h(a: Any, b: Any) -> Any:
+        ta=type(a); tb=type(b)
+        if (ta is int or ta is float) and (tb is int or tb is float):
+            return fn(a, b)
+        if op == "+" and isinstance(a, str) and isinstance(b, str):
+            return a + b
+        if not isinstance(a, (int,float)) or not isinstance(b, (int,float)):
+            raise HandRuntimeError("HND-RT-1201", f"Operator '{op}' expects numbers (or Text+Text), got {type(a).__name__} and {type(b).__name__}.")
+        return fn(a, b)
+    return h
+
+def _compare(op: str, fn: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    def h(a: Any, b: Any) -> Any:
+        ta=type(a); tb=type(b)
+        if (ta is int or ta is float) and (tb is int or tb is float):
+            return fn(a, b)
+        # comparisons: numbers only (v0.1)
+        if not isinstance(a, (int,float)) or not isinstance(b, (int,float)):
+            raise HandRuntimeError("HND-RT-1202", f"Comparison '{op}' expects numbers, got {type(a).__name__} and {type(b).__name__}.")
+        return fn(a, b)
+    return h
+
+_BINOPS: Dict[str, Callable[[Any, Any], Any]] = {
+    **{op: _arith(op, fn) for op, fn in (("+", operator.add), ("-", operator.sub), ("*", operator.mul),
+                                        ("/", operator.truediv), ("%", operator.mod))},
+    # equality accepts any operands
+    "==": operator.eq,
+    "!=": operator.ne,
+    **{op: _compare(op, fn) for op, fn in (("<", operator.lt), ("<=", operator.le), (">", operator.gt), (">=", operator.ge))},
+}
+
+# _repr of the small ints that dominate counters and indices: _SMALL_INT_REPR[i+128]
+_SMALL_INT_REPR: Tuple[str, ...] = tuple(str(i) for i in range(-128, 257))
+
+def _write_trace(path: str, payload: List[Dict[str, Any]]) -> None:
+    if orjson is not None:
+        try:
+            # same bytes as json.dump(..., ensure_ascii=False, indent=2) for trace payloads
+            pathlib.Path(path).write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+            return
+        except TypeError:
+            pass  # non-str keys, ints beyond 64 bits, lone surrogates, ...: let json handle it
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
 class Interpreter:
-    def __init__(self, *, inputs: Optional[List[str]]=None, max_steps: int=200_000, max_loop_iters: int=1_000_000):
+    def __init__(self, *, inputs: Optional[List[str]]=None, max_steps: int=200_000, max_loop_iters: int=1_000_000, record_trace: bool=True):
+        # record_trace=False keeps only Ω/Σ: steps are still counted (the step limit
+        # applies), but no events are kept and no trace.json is written.
         self.inputs=list(inputs or [])
         self.input_i=0
         self.max_steps=max_steps
         self.max_loop_iters=max_loop_iters
 
         self.step=0
+        self.record_trace=record_trace
         self.trace: List[TraceEvent]=[]
         self.outputs: List[str]=[]
 
-        self.store=Store(frames=[{}])
+        self.store=Store(vars={}, saved=[])
         self.functions: Dict[str, A.FuncDef]={}
+        self._block_scoped: Dict[int, Tuple[Sequence[A.Stmt], bool]]={}
+        # one dict probe on the node's class instead of an isinstance chain
+        self._expr_dispatch: Dict[type, Callable[[Any], Any]]={
+            A.Literal: self._ev_literal,
+            A.Var: self._ev_var,
+            A.Paren: self._ev_paren,
+            A.Unary: self._ev_unary,
+            A.Binary: self._ev_binary,
+            A.Call: self._ev_call,
+        }
+        self._stmt_dispatch: Dict[type, Callable[[Any], None]]={
+            A.AssignStmt: self._ex_assign,
+            A.ExprStmt: self._ex_expr,
+            A.ShowStmt: self._ex_show,
+            A.VerifyStmt: self._ex_verify,
+            A.IfStmt: self._ex_if,
+            A.WhileStmt: self._ex_while,
+            A.ReturnStmt: self._ex_return,
+        }
 
     def _emit(self, kind: str, detail: Dict[str, Any]) -> None:
         self.step += 1
         if self.step > self.max_steps:
             raise HandRuntimeError("HND-RT-9999", "Step limit exceeded (possible infinite loop).")
-        self.trace.append(TraceEvent(step=self.step, kind=kind, detail=detail))
+        if self.record_trace:
+            self.trace.append(TraceEvent(self.step, kind, detail))
 
     # --------
     # IO
@@ -125,6 +231,20 @@ class Interpreter:
     def _repr(self, v: Any) -> str:
         if v is None:
             return "null"
+        # exact-type fast path for the scalars every trace event renders; bool is
+        # tested by identity, so it never reaches the int branch
+        if v is True:
+            return "true"
+        if v is False:
+            return "false"
+        t=type(v)
+        if t is int:
+            return _SMALL_INT_REPR[v+128] if -128 <= v < 257 else str(v)
+        if t is str:
+            return v
+        if t is float:
+            return format(v, ".15g")
+        # subclasses, lists and dicts
         if isinstance(v, bool):
             return "true" if v else "false"
         if isinstance(v, float):
@@ -144,188 +264,175 @@ class Interpreter:
     # ----------------
 
     def eval_expr(self, e: A.Expr) -> Any:
-        self._emit("eval_expr", {"expr": type(e).__name__})
-
-        if isinstance(e, A.Literal):
-            if e.kind == "Text":
-                return self._unescape_string(e.value)
-            return e.value
-
-        if isinstance(e, A.Var):
-            return self.store.get(e.name)
-
-        if isinstance(e, A.Paren):
-            return self.eval_expr(e.expr)
-
-        if isinstance(e, A.Unary):
-            v=self.eval_expr(e.expr)
-            if e.op == "-":
-                if not isinstance(v, (int,float)):
-                    raise HandRuntimeError("HND-RT-0201", f"Unary '-' expects number, got {type(v).__name__}.")
-                return -v
-            raise HandRuntimeError("HND-RT-0200", f"Unknown unary operator '{e.op}'.")
-
-        if isinstance(e, A.Binary):
-            a=self.eval_expr(e.left)
-            b=self.eval_expr(e.right)
-            return self._eval_bin(a, e.op, b)
-
-        if isinstance(e, A.Call):
-            # builtins
-            if e.callee == "ask":
-                if len(e.args)!=1:
-                    raise HandRuntimeError("HND-RT-0102", "ask(prompt) expects exactly 1 argument.")
-                return self._ask(self.eval_expr(e.args[0]))
-            if e.callee == "show":
-                if len(e.args)!=1:
-                    raise HandRuntimeError("HND-RT-0103", "show(value) expects exactly 1 argument.")
-                self._show(self.eval_expr(e.args[0]))
-                return None
-
-            # user function
-            if e.callee not in self.functions:
-                raise HandRuntimeError("HND-RT-0301", f"Unknown function '{e.callee}'.")
-            fn=self.functions[e.callee]
-            if len(e.args) != len(fn.params):
-                raise HandRuntimeError("HND-RT-0302", f"Function '{e.callee}' expects {len(fn.params)} args, got {len(e.args)}.")
-            argvals=[self.eval_expr(a) for a in e.args]
-            self._emit("call", {"fn": e.callee, "args":[self._repr(x) for x in argvals]})
-            return self._call_user(fn, argvals)
-
-        raise HandRuntimeError("HND-RT-0002", f"Unsupported expression node: {type(e).__name__}.")
-
-    def _unescape_string(self, s: str) -> str:
+        name=type(e).__name__
+        self._emit("eval_expr", {"expr": name})
+        h=self._expr_dispatch.get(type(e))
+        if h is None:
+            raise HandRuntimeError("HND-RT-0002", f"Unsupported expression node: {name}.")
+        return h(e)
+
+    def _ev_literal(self, e: A.Literal) -> Any:
+        if e.kind == "Text":
+            return self._unescape_string(e.value)
+        return e.value
+
+    def _ev_var(self, e: A.Var) -> Any:
+        return self.store.get(e.name)
+
+    def _ev_paren(self, e: A.Paren) -> Any:
+        return self.eval_expr(e.expr)
+
+    def _ev_unary(self, e: A.Unary) -> Any:
+        v=self.eval_expr(e.expr)
+        if e.op == "-":
+            if not isinstance(v, (int,float)):
+                raise HandRuntimeError("HND-RT-0201", f"Unary '-' expects number, got {type(v).__name__}.")
+            return -v
+        raise HandRuntimeError("HND-RT-0200", f"Unknown unary operator '{e.op}'.")
+
+    def _ev_binary(self, e: A.Binary) -> Any:
+        a=self.eval_expr(e.left)
+        b=self.eval_expr(e.right)
+        h=_BINOPS.get(e.op)
+        if h is None:
+            raise HandRuntimeError("HND-RT-1200", f"Unknown operator '{e.op}'.")
+        return h(a, b)
+
+    def _ev_call(self, e: A.Call) -> Any:
+        # builtins
+        if e.callee == "ask":
+            if len(e.args)!=1:
+                raise HandRuntimeError("HND-RT-0102", "ask(prompt) expects exactly 1 argument.")
+            return self._ask(self.eval_expr(e.args[0]))
+        if e.callee == "show":
+            if len(e.args)!=1:
+                raise HandRuntimeError("HND-RT-0103", "show(value) expects exactly 1 argument.")
+            self._show(self.eval_expr(e.args[0]))
+            return None
+
+        # user function
+        if e.callee not in self.functions:
+            raise HandRuntimeError("HND-RT-0301", f"Unknown function '{e.callee}'.")
+        fn=self.functions[e.callee]
+        if len(e.args) != len(fn.params):
+            raise HandRuntimeError("HND-RT-0302", f"Function '{e.callee}' expects {len(fn.params)} args, got {len(e.args)}.")
+        argvals=[self.eval_expr(a) for a in e.args]
+        self._emit("call", {"fn": e.callee, "args":[self._repr(x) for x in argvals]})
+        return self._call_user(fn, argvals)
+
+    # Text literals are decoded on every evaluation (e.g. each pass of a loop
+    # body); the result depends only on the literal, so it is memoized.
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _unescape_string(s: str) -> str:
         # lexer stores strings including quotes; preserve determinism
         if len(s) >= 2 and s[0] == '"' and s[-1] == '"':
             body=s[1:-1]
+            if "\\" not in body:
+                return body
             # minimal escapes: \\n, \\t, \\\\, \\"
+            # text between backslashes is copied as whole slices
             out=[]
             i=0
-            while i < len(body):
-                ch=body[i]
-                if ch != "\\": 
-                    out.append(ch); i+=1; continue
-                if i+1 >= len(body):
+            n=len(body)
+            while i < n:
+                j=body.find("\\", i)
+                if j < 0:
+                    out.append(body[i:]); break
+                out.append(body[i:j])
+                if j+1 >= n:
                     out.append("\\"); break
-                nxt=body[i+1]
+                nxt=body[j+1]
                 # HAND v0.1: accept both "\\n" and "\\\\n" as newline for portability
-                if nxt == "\\" and i+2 < len(body) and body[i+2] in ("n","t"):
-                    out.append("\n".encode("utf-8").decode("unicode_escape") if body[i+2]=="n" else "\t".encode("utf-8").decode("unicode_escape"))
-                    i += 3
+                if nxt == "\\" and j+2 < n and body[j+2] in ("n","t"):
+                    out.append(_ESCAPES[body[j+2]])
+                    i = j+3
                     continue
-                if nxt == "n": out.append("\n".encode("utf-8").decode("unicode_escape"))
-                elif nxt == "t": out.append("\t".encode("utf-8").decode("unicode_escape"))
-                elif nxt == "\\": out.append("\\")
-                elif nxt == '"': out.append('"')
-                else:
-                    # unknown escape -> keep literal (deterministic, strict)
-                    out.append(nxt)
-                i += 2
+                # unknown escape -> keep literal (deterministic, strict)
+                out.append(_ESCAPES.get(nxt, nxt))
+                i = j+2
             return "".join(out)
         return s
 
-    def _eval_bin(self, a: Any, op: str, b: Any) -> Any:
-        if op in ("+","-","*","/","%"):
-            if op == "+" and isinstance(a, str) and isinstance(b, str):
-                return a + b
-            if not isinstance(a, (int,float)) or not isinstance(b, (int,float)):
-                raise HandRuntimeError("HND-RT-1201", f"Operator '{op}' expects numbers (or Text+Text), got {type(a).__name__} and {type(b).__name__}.")
-            if op == "+": return a + b
-            if op == "-": return a - b
-            if op == "*": return a * b
-            if op == "/": return a / b
-            if op == "%": return a % b
-
-        if op in ("==","!=","<","<=",">",">="):
-            if op == "==": return a == b
-            if op == "!=": return a != b
-            # comparisons: numbers only (v0.1)
-            if not isinstance(a, (int,float)) or not isinstance(b, (int,float)):
-                raise HandRuntimeError("HND-RT-1202", f"Comparison '{op}' expects numbers, got {type(a).__name__} and {type(b).__name__}.")
-            if op == "<": return a < b
-            if op == "<=": return a <= b
-            if op == ">": return a > b
-            if op == ">=": return a >= b
-
-        raise HandRuntimeError("HND-RT-1200", f"Unknown operator '{op}'.")
-
     # -------------
     # Statements
     # -------------
 
     def exec_stmt(self, s: A.Stmt) -> None:
-        self._emit("enter_stmt", {"stmt": type(s).__name__})
-
-        if isinstance(s, A.AssignStmt):
-            v=self.eval_expr(s.value)
-            self.store.set(s.name, v)
-            self._emit("assign", {"name": s.name, "value": self._repr(v)})
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
-            return
-
-        if isinstance(s, A.ExprStmt):
-            self.eval_expr(s.expr)
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
-            return
-
-        if isinstance(s, A.ShowStmt):
-            v=self.eval_expr(s.value)
-            self._show(v)
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
-            return
-
-        if isinstance(s, A.VerifyStmt):
-            ok=self.eval_expr(s.expr)
-            if not isinstance(ok, bool):
-                raise HandRuntimeError("HND-RT-0402", f"VERIFY expects Bool, got {type(ok).__name__}.")
-            self._emit("verify", {"expr": self._repr(ok)})
-            if not ok:
-                raise HandRuntimeError("HND-RT-0401", "VERIFY failed.")
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
-            return
-
-        if isinstance(s, A.IfStmt):
+        name=type(s).__name__
+        self._emit("enter_stmt", {"stmt": name})
+        h=self._stmt_dispatch.get(type(s))
+        if h is None:
+            raise HandRuntimeError("HND-RT-0003", f"Unsupported statement node: {name}.")
+        h(s)
+        # handlers that leave the statement abnormally (return, failed verify) raise past this
+        self._emit("exit_stmt", {"stmt": name})
+
+    def _ex_assign(self, s: A.AssignStmt) -> None:
+        v=self.eval_expr(s.value)
+        self.store.set(s.name, v)
+        self._emit("assign", {"name": s.name, "value": self._repr(v)})
+
+    def _ex_expr(self, s: A.ExprStmt) -> None:
+        self.eval_expr(s.expr)
+
+    def _ex_show(self, s: A.ShowStmt) -> None:
+        v=self.eval_expr(s.value)
+        self._show(v)
+
+    def _ex_verify(self, s: A.VerifyStmt) -> None:
+        ok=self.eval_expr(s.expr)
+        if not isinstance(ok, bool):
+            raise HandRuntimeError("HND-RT-0402", f"VERIFY expects Bool, got {type(ok).__name__}.")
+        self._emit("verify", {"expr": self._repr(ok)})
+        if not ok:
+            raise HandRuntimeError("HND-RT-0401", "VERIFY failed.")
+
+    def _ex_if(self, s: A.IfStmt) -> None:
+        cond=self.eval_expr(s.cond)
+        if not isinstance(cond, bool):
+            raise HandRuntimeError("HND-RT-0501", "if condition must be Bool.")
+        self._emit("branch", {"cond": cond})
+        self._exec_block(s.then_body if cond else (s.else_body or ()))
+
+    def _ex_while(self, s: A.WhileStmt) -> None:
+        it=0
+        while True:
+            it += 1
+            if it > self.max_loop_iters:
+                raise HandRuntimeError("HND-RT-9998", "Loop iteration limit exceeded.")
             cond=self.eval_expr(s.cond)
             if not isinstance(cond, bool):
-                raise HandRuntimeError("HND-RT-0501", "if condition must be Bool.")
-            self._emit("branch", {"cond": cond})
-            body = s.then_body if cond else (s.else_body or [])
-            self.store.push()
-            try:
-                for st in body:
-                    self.exec_stmt(st)
-            finally:
-                self.store.pop()
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
-            return
-
-        if isinstance(s, A.WhileStmt):
-            it=0
-            while True:
-                it += 1
-                if it > self.max_loop_iters:
-                    raise HandRuntimeError("HND-RT-9998", "Loop iteration limit exceeded.")
-                cond=self.eval_expr(s.cond)
-                if not isinstance(cond, bool):
-                    raise HandRuntimeError("HND-RT-0601", "while condition must be Bool.")
-                self._emit("loop_check", {"iter": it, "cond": cond})
-                if not cond:
-                    break
-                self.store.push()
-                try:
-                    for st in s.body:
-                        self.exec_stmt(st)
-                finally:
-                    self.store.pop()
-            self._emit("exit_stmt", {"stmt": type(s).__name__})
+                raise HandRuntimeError("HND-RT-0601", "while condition must be Bool.")
+            self._emit("loop_check", {"iter": it, "cond": cond})
+            if not cond:
+                break
+            self._exec_block(s.body)
+
+    def _exec_block(self, body: Sequence[A.Stmt]) -> None:
+        # An if/while body gets its own scope, but only a direct assignment can
+        # bind a name in it (nested blocks and calls open their own), so bodies
+        # without one run in the enclosing scope and skip the push/pop.
+        key=id(body)
+        hit=self._block_scoped.get(key)
+        if hit is None:
+            # the body is kept in the entry so its id cannot be reused
+            hit=self._block_scoped[key]=(body, any(type(st) is A.AssignStmt for st in body))
+        if not hit[1]:
+            for st in body:
+                self.exec_stmt(st)
             return
+        self.store.push()
+        try:
+            for st in body:
+                self.exec_stmt(st)
+        finally:
+            self.store.pop()
 
-        if isinstance(s, A.ReturnStmt):
-            val=None if s.value is None else self.eval_expr(s.value)
-            self._emit("return", {"value": self._repr(val)})
-            raise _ReturnSignal(val)
-
-        raise HandRuntimeError("HND-RT-0003", f"Unsupported statement node: {type(s).__name__}.")
+    def _ex_return(self, s: A.ReturnStmt) -> None:
+        val=None if s.value is None else self.eval_expr(s.value)
+        self._emit("return", {"value": self._repr(val)})
+        raise _ReturnSignal(val)
 
     # -------------
     # Program / funcs
@@ -377,24 +484,25 @@ class Interpreter:
     
     def store_snapshot(self) -> Dict[str, Any]:
         # Σ: final observable store for equivalence oracle (top-level frame only)
-        # Note: frames[-1] is the current scope; frames[0] is global.
         try:
             if isinstance(self.store, dict):
                 # legacy
                 return dict(self.store)
-            frames = getattr(self.store, "frames", None)
-            if isinstance(frames, list) and frames:
+            if isinstance(self.store, Store):
                 # expose global frame
-                return dict(frames[0])
+                return self.store.global_frame()
         except Exception:
             pass
         return {}
 
     def _finalize(self) -> RunResult:
+        if not self.record_trace:
+            return RunResult(outputs=self.outputs, final_store=self.store_snapshot(), trace=self.trace, trace_path="")
         # write trace to a deterministic json file next to cwd (caller can override by copying)
         trace_path=str(pathlib.Path("trace.json").absolute())
-        with open(trace_path, "w", encoding="utf-8") as f:
-            json.dump([asdict(ev) for ev in self.trace], f, ensure_ascii=False, indent=2)
+        # events hold only JSON scalars/lists/dicts, so each instance __dict__ serializes
+        # exactly as asdict() would, without its recursive deep copy
+        _write_trace(trace_path, [ev.__dict__ for ev in self.trace])
         return RunResult(outputs=self.outputs, final_store=self.store_snapshot(), trace=self.trace, trace_path=trace_path)
 
 # -------------------------
@@ -115,9 +115,9 @@ def lex(text: str, filename: str="<input>") -> Tuple[List[Token], List[Diagnosti
             idref=f"1🐛{lex_err_n}",
             code=code,
             severity="error",
-            message_human=msg,
+            message_template=msg,
             src=SrcLoc(filename, line, col),
-            fix=fix
+            fix_template=fix
         ))
 
     def ind_error(line:int, code:str, msg:str, fix:str|None=None):
@@ -127,9 +127,9 @@ def lex(text: str, filename: str="<input>") -> Tuple[List[Token], List[Diagnosti
             idref=f"2🐛{ind_err_n}",
             code=code,
             severity="error",
-            message_human=msg,
+            message_template=msg,
             src=SrcLoc(filename, line, 1),
-            fix=fix
+            fix_template=fix
         ))
 
     for li, raw in enumerate(lines, start=1):
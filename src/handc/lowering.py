@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from . import ast as A
 
@@ -101,7 +101,17 @@ def lower_expr(e: A.Expr, ids: _IdGen) -> Dict[str, Any]:
 # Stmt lowering
 # ------------------------
 
-def lower_stmt(s: A.Stmt, ids: _IdGen) -> Dict[str, Any]:
+# (effects, capabilities) collected while lowering, nested bodies included
+_EffectSink = Tuple[Set[str], Set[str]]
+
+def lower_stmt(s: A.Stmt, ids: _IdGen, fx: Optional[_EffectSink]=None) -> Dict[str, Any]:
+    ir=_lower_stmt(s, ids, fx)
+    if fx is not None:
+        fx[0].update(ir["effects"])
+        fx[1].update(ir["capabilities"])
+    return ir
+
+def _lower_stmt(s: A.Stmt, ids: _IdGen, fx: Optional[_EffectSink]) -> Dict[str, Any]:
     nid=ids.next()
 
     if isinstance(s, A.AssignStmt):
@@ -146,8 +156,8 @@ def lower_stmt(s: A.Stmt, ids: _IdGen) -> Dict[str, Any]:
         return {
             "kind":"if",
             "cond": lower_expr(s.cond, ids),
-            "then": [lower_stmt(x, ids) for x in s.then_body],
-            "else": [lower_stmt(x, ids) for x in (s.else_body or [])],
+            "then": [lower_stmt(x, ids, fx) for x in s.then_body],
+            "else": [lower_stmt(x, ids, fx) for x in (s.else_body or [])],
             "origin": _mk_origin("👤","🧭",nid,"if"),
             "effects": [],
             "capabilities": []
@@ -157,7 +167,7 @@ def lower_stmt(s: A.Stmt, ids: _IdGen) -> Dict[str, Any]:
         return {
             "kind":"while",
             "cond": lower_expr(s.cond, ids),
-            "body": [lower_stmt(x, ids) for x in s.body],
+            "body": [lower_stmt(x, ids, fx) for x in s.body],
             "origin": _mk_origin("👤","🔁",nid,"while"),
             "effects": [],
             "capabilities": []
@@ -187,23 +197,11 @@ def lower_stmt(s: A.Stmt, ids: _IdGen) -> Dict[str, Any]:
 
 def lower_function(fn: A.FuncDef, ids: _IdGen) -> Dict[str, Any]:
     nid=ids.next()
-    body=[lower_stmt(s, ids) for s in fn.body]
-    effects=[]
-    caps=[]
-    # simple effect/capability discovery
-    def walk_stmt(st):
-        nonlocal effects, caps
-        effects += st.get("effects", [])
-        caps += st.get("capabilities", [])
-        if st["kind"]=="if":
-            for x in st.get("then",[]): walk_stmt(x)
-            for x in st.get("else",[]): walk_stmt(x)
-        if st["kind"]=="while":
-            for x in st.get("body",[]): walk_stmt(x)
-    for st in body:
-        walk_stmt(st)
-    effects=sorted(set(effects))
-    caps=sorted(set(caps))
+    # effect/capability discovery happens while the body is lowered
+    fx: _EffectSink=(set(), set())
+    body=[lower_stmt(s, ids, fx) for s in fn.body]
+    effects=sorted(fx[0])
+    caps=sorted(fx[1])
 
     params=[]
     for p in fn.params:
@@ -56,9 +56,9 @@ class Parser:
             idref=f"3🐛{self.err_n}",
             code=code,
             severity="error",
-            message_human=f"{msg}: expected {kind}{'='+value if value else ''}, got {t.kind}({t.value})",
+            message_template=f"{msg}: expected {kind}{'='+value if value else ''}, got {t.kind}({t.value})",
             src=SrcLoc(self.filename, t.span.line, t.span.col),
-            fix="Check HAND syntax near this location."
+            fix_template="Check HAND syntax near this location."
         ))
         return t
 
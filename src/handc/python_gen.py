@@ -45,26 +45,49 @@ def gen_python(ir: Dict[str, Any], *, module_name: str = "main") -> str:
     emit("from typing import Any, Dict, List")
     emit("")
     emit("# --- Runtime (matches interpreter_ref repr rules) ---")
+    emit("_UNBOUND = object()")
+    emit("")
+    # Flat scope: `vars` holds the visible binding of every name, so get/set are
+    # one dict operation regardless of call depth; each pushed frame records the
+    # bindings it shadowed and pop() restores them.
     emit("@dataclass")
     emit("class Store:")
-    emit("    frames: List[Dict[str, Any]]")
+    emit("    vars: Dict[str, Any]")
+    emit("    saved: List[Dict[str, Any]]")
     emit("    def get(self, name: str) -> Any:")
-    emit("        for fr in reversed(self.frames):")
-    emit("            if name in fr:")
-    emit("                return fr[name]")
-    emit("        raise RuntimeError(f\"HND-RT-0001 Undefined variable '{name}'.\")")
+    emit("        v = self.vars.get(name, _UNBOUND)")
+    emit("        if v is _UNBOUND:")
+    emit("            raise RuntimeError(f\"HND-RT-0001 Undefined variable '{name}'.\")")
+    emit("        return v")
     emit("    def set(self, name: str, value: Any) -> None:")
-    emit("        for fr in reversed(self.frames):")
-    emit("            if name in fr:")
-    emit("                fr[name] = value")
-    emit("                return")
-    emit("        self.frames[-1][name] = value")
+    emit("        if name in self.vars:")
+    emit("            self.vars[name] = value")
+    emit("        else:")
+    emit("            self.declare(name, value)")
     emit("    def declare(self, name: str, value: Any) -> None:")
-    emit("        self.frames[-1][name] = value")
+    emit("        if self.saved:")
+    emit("            fr = self.saved[-1]")
+    emit("            if name not in fr:")
+    emit("                fr[name] = self.vars.get(name, _UNBOUND)")
+    emit("        self.vars[name] = value")
     emit("    def push(self) -> None:")
-    emit("        self.frames.append({})")
+    emit("        self.saved.append({})")
     emit("    def pop(self) -> None:")
-    emit("        self.frames.pop()")
+    emit("        for name, old in self.saved.pop().items():")
+    emit("            if old is _UNBOUND:")
+    emit("                del self.vars[name]")
+    emit("            else:")
+    emit("                self.vars[name] = old")
+    emit("")
+    # Scalars are rendered through a table keyed on the exact type (a bool never
+    # reaches the int entry); lists, dicts and subclasses take the isinstance chain.
+    emit("_REPR_SCALAR = {")
+    emit("    type(None): lambda v: 'null',")
+    emit("    bool: lambda v: 'true' if v else 'false',")
+    emit("    float: lambda v: format(v, '.15g'),")
+    emit("    int: str,")
+    emit("    str: str,")
+    emit("}")
     emit("")
     emit("@dataclass")
     emit("class Runtime:")
@@ -72,6 +95,9 @@ def gen_python(ir: Dict[str, Any], *, module_name: str = "main") -> str:
     emit("    outputs: List[str]")
     emit("    ip: int = 0")
     emit("    def _repr(self, v: Any) -> str:")
+    emit("        f = _REPR_SCALAR.get(type(v))")
+    emit("        if f is not None:")
+    emit("            return f(v)")
     emit("        if v is None:")
     emit("            return 'null'")
     emit("        if isinstance(v, bool):")
@@ -224,12 +250,12 @@ def gen_python(ir: Dict[str, Any], *, module_name: str = "main") -> str:
 
     emit("# --- Top-level ---")
     emit("def __hand_main(inputs: List[str]) -> Dict[str, Any]:")
-    emit("    store = Store(frames=[{}])")
+    emit("    store = Store(vars={}, saved=[])")
     emit("    rt = Runtime(inputs=list(inputs), outputs=[])")
     for st in mod.get("toplevel", []) or []:
         for ln in emit_stmt(st, 4):
             emit(ln)
-    emit("    return {\"outputs\": rt.outputs, \"store\": store.frames[0]}")
+    emit("    return {\"outputs\": rt.outputs, \"store\": store.vars}")
     emit("")
     emit("def __hand_run_and_print_json(inputs: List[str]) -> None:")
     emit("    import json")
@@ -1,6 +1,8 @@
 from __future__ import annotations
+import functools
+import io
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # HAND-IR v0.1 -> SQL v0.1 (script)
 #
@@ -48,6 +50,17 @@ def _origin_ref(node: Dict[str, Any]) -> Optional[str]:
     except Exception:
         return None
 
+# Leaf IR types map to a fixed (sql_type, nullable) pair.
+_LEAF_SQL_TYPES: Dict[str, Tuple[str, bool]] = {
+    "Int": ("INTEGER", False),
+    "Float": ("REAL", False),
+    "Bool": ("BOOLEAN", False),
+    "Text": ("TEXT", False),
+    "Null": ("TEXT", True),
+    # Foreign-key-ish reference (by convention: <Record>.id)
+    "Record": ("INTEGER", False),
+}
+
 def _type_to_sql(t: Dict[str, Any]) -> Tuple[str, bool]:
     """Return (sql_type, nullable)."""
     k = t.get("kind")
@@ -57,24 +70,25 @@ def _type_to_sql(t: Dict[str, Any]) -> Tuple[str, bool]:
             raise ValueError("Optional missing inner type")
         sql, _ = _type_to_sql(inner)
         return sql, True
-    if k == "Int":
-        return "INTEGER", False
-    if k == "Float":
-        return "REAL", False
-    if k == "Bool":
-        return "BOOLEAN", False
-    if k == "Text":
-        return "TEXT", False
-    if k == "Null":
-        return "TEXT", True
-    if k == "Record":
-        # Foreign-key-ish reference (by convention: <Record>.id)
-        return "INTEGER", False
+    r = _LEAF_SQL_TYPES.get(k) if isinstance(k, str) else None
+    if r is not None:
+        return r
     raise SqlGenError(SqlNote("ERROR", "SQL-0300", f"Type '{k}' is not supported in SQL v0.1.", None))
 
 def _lit_to_sql(expr: Dict[str, Any]) -> str:
     v = expr.get("value")
     ty = (expr.get("type") or {}).get("kind")
+    if isinstance(v, float):
+        # not cached: 0.0 and -0.0 are equal keys but render differently
+        return str(v)
+    if (v is None or isinstance(v, (str, int))) and (ty is None or isinstance(ty, str)):
+        return _scalar_lit_to_sql(ty, v)
+    return "'" + str(v).replace("'", "''") + "'"
+
+# Literal values repeat a lot (NULL, TRUE, 0, 1, ''). typed=True keeps 1 and
+# True apart, since they hash alike but render differently.
+@functools.lru_cache(maxsize=1024, typed=True)
+def _scalar_lit_to_sql(ty: Optional[str], v: Any) -> str:
     if v is None or (isinstance(v, str) and v.strip().lower() == "null"):
         return "NULL"
     if ty == "Bool" and isinstance(v, str):
@@ -83,14 +97,13 @@ def _lit_to_sql(expr: Dict[str, Any]) -> str:
         if s=="false": return "FALSE"
     if isinstance(v, (int, float)):
         return str(v)
-    if isinstance(v, str):
-        # Text literal tokens come like '"hi"' from lowering; accept either raw or token.
-        s=v
-        if len(s)>=2 and s[0]==s[-1]=='"':
-            s=s[1:-1]
-        s=s.replace("'", "''")
-        return "'" + s + "'"
-    return "'" + str(v).replace("'", "''") + "'"
+    return "'" + _unquote(v).replace("'", "''") + "'"
+
+# Text literal tokens come like '"hi"' from lowering; accept either raw or token.
+# Table and column names repeat across statements, so the stripped form is memoized.
+@functools.lru_cache(maxsize=1024)
+def _unquote(s: str) -> str:
+    return s[1:-1] if len(s)>1 and s[0]=='"'==s[-1] else s
 
 def _expect_call(expr: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
     if expr.get("kind") != "call":
@@ -103,9 +116,7 @@ def _as_text_key(expr: Dict[str, Any]) -> str:
     v = expr.get("value")
     if not isinstance(v, str):
         raise SqlGenError(SqlNote("ERROR","SQL-0103","map() keys must be Text literals.", _origin_ref(expr)))
-    if len(v)>=2 and v[0]==v[-1]=='"':
-        v=v[1:-1]
-    return v
+    return _unquote(v)
 
 def _decode_list(expr: Dict[str, Any]) -> List[Dict[str, Any]]:
     cal, args = _expect_call(expr)
@@ -143,6 +154,59 @@ def _build_where(pairs: List[Tuple[str, Dict[str, Any]]]) -> str:
         clauses.append(f"{col} = {_expr_value_to_sql(vexpr)}")
     return " WHERE " + " AND ".join(clauses)
 
+# ------------------------
+# DML emitters: builtin name -> (call expr, args) -> one SQL statement
+# ------------------------
+
+def _emit_insert(expr: Dict[str, Any], args: List[Dict[str, Any]]) -> str:
+    # insert(table, values=map(...))
+    if len(args) != 2:
+        raise SqlGenError(SqlNote("ERROR","SQL-0400","insert(table, values) requires 2 args.", _origin_ref(expr)))
+    table = _as_text_key(args[0])
+    pairs = _decode_map(args[1])
+    cols = ", ".join(k for k,_ in pairs)
+    vals = ", ".join(_expr_value_to_sql(v) for _,v in pairs)
+    return f"INSERT INTO {table} ({cols}) VALUES ({vals});"
+
+def _emit_select(expr: Dict[str, Any], args: List[Dict[str, Any]]) -> str:
+    # select(table, columns=list(...), where=map(...)?)
+    if len(args) < 2 or len(args) > 3:
+        raise SqlGenError(SqlNote("ERROR","SQL-0410","select(table, columns, [where]) expects 2 or 3 args.", _origin_ref(expr)))
+    table = _as_text_key(args[0])
+    cols = _decode_list(args[1])
+    col_sql = ", ".join(_as_text_key(c) for c in cols) if cols else "*"
+    where_sql = _build_where(_decode_map(args[2])) if len(args) == 3 else ""
+    return f"SELECT {col_sql} FROM {table}{where_sql};"
+
+def _emit_update(expr: Dict[str, Any], args: List[Dict[str, Any]]) -> str:
+    # update(table, set=map(...), where=map(...))
+    if len(args) != 3:
+        raise SqlGenError(SqlNote("ERROR","SQL-0420","update(table, set, where) expects 3 args.", _origin_ref(expr)))
+    table = _as_text_key(args[0])
+    set_pairs = _decode_map(args[1])
+    where_pairs = _decode_map(args[2])
+    set_sql = ", ".join(f"{k} = {_expr_value_to_sql(v)}" for k,v in set_pairs)
+    where_sql = _build_where(where_pairs)
+    return f"UPDATE {table} SET {set_sql}{where_sql};"
+
+def _emit_delete(expr: Dict[str, Any], args: List[Dict[str, Any]]) -> str:
+    # delete(table, where=map(...))
+    if len(args) != 2:
+        raise SqlGenError(SqlNote("ERROR","SQL-0430","delete(table, where) expects 2 args.", _origin_ref(expr)))
+    table = _as_text_key(args[0])
+    where_sql = _build_where(_decode_map(args[1]))
+    return f"DELETE FROM {table}{where_sql};"
+
+_SQL_OPS: Dict[str, Callable[[Dict[str, Any], List[Dict[str, Any]]], str]] = {
+    "begin_tx": lambda expr, args: "BEGIN;",
+    "commit": lambda expr, args: "COMMIT;",
+    "rollback": lambda expr, args: "ROLLBACK;",
+    "insert": _emit_insert,
+    "select": _emit_select,
+    "update": _emit_update,
+    "delete": _emit_delete,
+}
+
 def gen_sql(ir: Dict[str, Any]) -> Tuple[str, List[SqlNote]]:
     if ir.get("ir_version") != "0.1.0":
         raise ValueError("Unsupported IR version")
@@ -153,8 +217,13 @@ def gen_sql(ir: Dict[str, Any]) -> Tuple[str, List[SqlNote]]:
     if (mod.get("functions") or []):
         raise SqlGenError(SqlNote("ERROR","SQL-0001","SQL v0.1 does not compile HAND functions (only module.types + top-level DML calls).", _origin_ref((mod.get('functions') or [])[0])))
 
-    lines: List[str] = []
-    emit = lines.append
+    # Lines go straight into a text buffer rather than a list joined at the end.
+    out = io.StringIO()
+    write = out.write
+
+    def emit(line: str) -> None:
+        write(line)
+        write("\n")
 
     emit("-- HAND SQL v0.1 (generated)")
     emit(f"-- module: {mod.get('name')}")
@@ -193,65 +262,9 @@ def gen_sql(ir: Dict[str, Any]) -> Tuple[str, List[SqlNote]]:
         expr = st.get("value")
         cal, args = _expect_call(expr)
 
-        if cal == "begin_tx":
-            emit("BEGIN;")
-            continue
-        if cal == "commit":
-            emit("COMMIT;")
-            continue
-        if cal == "rollback":
-            emit("ROLLBACK;")
-            continue
-
-        if cal == "insert":
-            # insert(table, values=map(...))
-            if len(args) != 2:
-                raise SqlGenError(SqlNote("ERROR","SQL-0400","insert(table, values) requires 2 args.", _origin_ref(expr)))
-            table = _as_text_key(args[0])
-            pairs = _decode_map(args[1])
-            cols = ", ".join(k for k,_ in pairs)
-            vals = ", ".join(_expr_value_to_sql(v) for _,v in pairs)
-            emit(f"INSERT INTO {table} ({cols}) VALUES ({vals});")
-            continue
-
-        if cal == "select":
-            # select(table, columns=list(...), where=map(...)?)
-            if len(args) < 2 or len(args) > 3:
-                raise SqlGenError(SqlNote("ERROR","SQL-0410","select(table, columns, [where]) expects 2 or 3 args.", _origin_ref(expr)))
-            table = _as_text_key(args[0])
-            cols_expr = args[1]
-            cols = _decode_list(cols_expr)
-            col_sql = ", ".join(_as_text_key(c) for c in cols) if cols else "*"
-            where_sql = ""
-            if len(args) == 3:
-                where_pairs = _decode_map(args[2])
-                where_sql = _build_where(where_pairs)
-            emit(f"SELECT {col_sql} FROM {table}{where_sql};")
-            continue
+        op = _SQL_OPS.get(cal) if isinstance(cal, str) else None
+        if op is None:
+            raise SqlGenError(SqlNote("ERROR","SQL-0999",f"Unsupported SQL builtin '{cal}'.", _origin_ref(expr)))
+        emit(op(expr, args))
 
-        if cal == "update":
-            # update(table, set=map(...), where=map(...))
-            if len(args) != 3:
-                raise SqlGenError(SqlNote("ERROR","SQL-0420","update(table, set, where) expects 3 args.", _origin_ref(expr)))
-            table = _as_text_key(args[0])
-            set_pairs = _decode_map(args[1])
-            where_pairs = _decode_map(args[2])
-            set_sql = ", ".join(f"{k} = {_expr_value_to_sql(v)}" for k,v in set_pairs)
-            where_sql = _build_where(where_pairs)
-            emit(f"UPDATE {table} SET {set_sql}{where_sql};")
-            continue
-
-        if cal == "delete":
-            # delete(table, where=map(...))
-            if len(args) != 2:
-                raise SqlGenError(SqlNote("ERROR","SQL-0430","delete(table, where) expects 2 args.", _origin_ref(expr)))
-            table = _as_text_key(args[0])
-            where_pairs = _decode_map(args[1])
-            where_sql = _build_where(where_pairs)
-            emit(f"DELETE FROM {table}{where_sql};")
-            continue
-
-        raise SqlGenError(SqlNote("ERROR","SQL-0999",f"Unsupported SQL builtin '{cal}'.", _origin_ref(expr)))
-
-    emit("")
-    return "\n".join(lines), notes
+    return out.getvalue(), notes
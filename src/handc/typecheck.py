@@ -1,6 +1,7 @@
 from __future__ import annotations
+import functools
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from .diagnostics import Diagnostic, SrcLoc
 from . import ast as A
@@ -8,35 +9,101 @@ from . import types as T
 
 # ------------------- Typing environment Γ -------------------
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Binding:
     typ: T.Type
     proven_non_null: bool = False  # flow refinement
 
-class Env:
-    def __init__(self):
-        self.frames: List[Dict[str, Binding]] = [{}]
-
-    def push(self):
-        self.frames.append({})
+@functools.lru_cache(maxsize=4096)
+def _mk_binding(typ: T.Type, proven_non_null: bool) -> Binding:
+    # Bindings are immutable values: share one object per (type, flag).
+    return Binding(typ, proven_non_null)
+
+_ARITH_OPS = frozenset({"+", "-", "*", "/", "%"})
+_EQ_OPS = frozenset({"==", "!="})
+_CMP_OPS = frozenset({"<", "<=", ">", ">="})
+# a literal's type depends only on its kind
+_LITERAL_TYPES: Dict[str, T.Type] = {
+    "Int": T.INT,
+    "Float": T.FLOAT,
+    "Bool": T.BOOL,
+    "Text": T.TEXT,
+    "Null": T.NULL,
+}
+
+# Journal record kinds (see Env.log)
+_J_PUSH, _J_POP, _J_ADD, _J_REPLACE, _J_MERGE = range(5)
 
-    def pop(self):
-        self.frames.pop()
+class Env:
+    # One table name -> stack of bindings (innermost last) instead of a list of
+    # per-scope dicts: lookups are a single dict probe regardless of depth.
+    # Each scope records the names it binds so pop() can unwind them.
+    #
+    # Every mutation is journaled in `log`, so a snapshot is just len(log) and
+    # restoring undoes the records past it (no copying of frames).
+    def __init__(self) -> None:
+        self.table: Dict[str, List[Binding]] = {}
+        self.scopes: List[Set[str]] = [set()]
+        self.log: List[Tuple[Any, ...]] = []
+
+    def push(self) -> None:
+        self.scopes.append(set())
+        self.log.append((_J_PUSH,))
+
+    def pop(self) -> None:
+        names=self.scopes.pop()
+        popped=[]
+        for name in names:
+            stack=self.table[name]
+            popped.append((name, stack.pop()))
+            if not stack:
+                del self.table[name]
+        self.log.append((_J_POP, names, popped))
+
+    def pop_into_parent(self) -> None:
+        # close the innermost scope, keeping its bindings in the enclosing one
+        inner=self.scopes.pop()
+        outer=self.scopes[-1]
+        shadowed=[]
+        for name in inner:
+            if name in outer:
+                stack=self.table[name]
+                b=stack.pop()
+                shadowed.append((name, stack[-1], b))
+                stack[-1]=b
+            else:
+                outer.add(name)
+        self.log.append((_J_MERGE, inner, shadowed))
 
     def get(self, name: str) -> Optional[Binding]:
-        for fr in reversed(self.frames):
-            if name in fr:
-                return fr[name]
-        return None
+        stack=self.table.get(name)
+        return stack[-1] if stack else None
+
+    def bind(self, name: str, b: Binding) -> None:
+        top=self.scopes[-1]
+        if name in top:
+            stack=self.table[name]
+            self.log.append((_J_REPLACE, name, stack[-1]))
+            stack[-1]=b
+        else:
+            top.add(name)
+            shadowed=self.table.get(name)
+            if shadowed is None:
+                self.table[name]=[b]
+            else:
+                shadowed.append(b)
+            self.log.append((_J_ADD, name))
 
-    def set(self, name: str, typ: T.Type):
-        self.frames[-1][name] = Binding(typ, proven_non_null=False)
+    def set(self, name: str, typ: T.Type) -> None:
+        self.bind(name, _mk_binding(typ, False))
 
-    def refine_non_null(self, name: str):
-        b=self.get(name)
-        if b is None:
+    def refine_non_null(self, name: str) -> None:
+        # refines the visible binding in whichever scope holds it
+        stack=self.table.get(name)
+        if not stack:
             return
-        b.proven_non_null=True
+        self.log.append((_J_REPLACE, name, stack[-1]))
+        stack[-1]=_mk_binding(stack[-1].typ, True)
 
     def current_type(self, name: str) -> Optional[T.Type]:
         b=self.get(name)
@@ -46,127 +113,204 @@ class Env:
             return b.typ.inner
         return b.typ
 
+    def mark(self) -> int:
+        return len(self.log)
+
+    def changed_since(self, mark: int) -> Set[str]:
+        names: Set[str]=set()
+        for rec in self.log[mark:]:
+            k=rec[0]
+            if k==_J_ADD or k==_J_REPLACE:
+                names.add(rec[1])
+            elif k==_J_POP or k==_J_MERGE:
+                names |= rec[1]
+        return names
+
+    def rollback(self, mark: int) -> None:
+        log=self.log
+        while len(log) > mark:
+            rec=log.pop()
+            k=rec[0]
+            if k==_J_ADD:
+                name=rec[1]
+                self.scopes[-1].discard(name)
+                stack=self.table[name]
+                stack.pop()
+                if not stack:
+                    del self.table[name]
+            elif k==_J_REPLACE:
+                self.table[rec[1]][-1]=rec[2]
+            elif k==_J_PUSH:
+                self.scopes.pop()
+            elif k==_J_POP:
+                self.scopes.append(rec[1])
+                for name, b in rec[2]:
+                    self.table.setdefault(name, []).append(b)
+            else:  # _J_MERGE
+                inner, shadowed = rec[1], rec[2]
+                outer=self.scopes[-1]
+                moved=inner.difference(n for n, _, _ in shadowed)
+                outer -= moved
+                for name, prev, b in shadowed:
+                    stack=self.table[name]
+                    stack[-1]=prev
+                    stack.append(b)
+                self.scopes.append(inner)
+
 # ------------------- Typechecker -------------------
 
+class _AbortTypecheck(Exception):
+    """Raised by TypeChecker.error once the error budget is spent."""
+
 class TypeChecker:
-    def __init__(self, filename: str="<input>"):
+    def __init__(self, filename: str="<input>", max_errors: Optional[int]=None) -> None:
         self.filename=filename
         self.diags: List[Diagnostic]=[]
         self.err_n=0
+        # stop after this many errors (None: check the whole file)
+        self.max_errors=max_errors
         self.env=Env()
         self.current_return: Optional[T.Type]=None
-
-    def error(self, code: str, msg: str, line: int, col: int, fix: str|None=None):
+        self._lower_cache: Dict[int, Tuple[A.TypeExpr, T.Type]]={}
+        # one dict probe on the node's class instead of an isinstance chain
+        self._expr_dispatch: Dict[type, Callable[[Any], T.Type]]={
+            A.Literal: self._t_literal,
+            A.Var: self._t_var,
+            A.Paren: self._t_paren,
+            A.Unary: self._t_unary,
+            A.Binary: self._t_binary,
+            A.Call: self._t_call,
+        }
+        self._stmt_dispatch: Dict[type, Callable[[Any], None]]={
+            A.AssignStmt: self._c_assign,
+            A.ShowStmt: self._c_show,
+            A.ExprStmt: self._c_expr,
+            A.VerifyStmt: self._c_verify,
+            A.ReturnStmt: self._c_return,
+            A.IfStmt: self._c_if,
+            A.WhileStmt: self._c_while,
+            A.FuncDef: self._c_funcdef,
+        }
+
+    def error(self, code: str, msg: str, line: int, col: int, fix: str|None=None, **args: Any) -> None:
+        # `msg`/`fix` are str.format templates over `args`, rendered on demand
         self.err_n += 1
         self.diags.append(Diagnostic(
             idref=f"4🐛{self.err_n}",
             code=code,
             severity="error",
-            message_human=msg,
+            message_template=msg,
             src=SrcLoc(self.filename, line, col),
-            fix=fix
+            fix_template=fix,
+            args=tuple(args.items()),
         ))
+        if self.max_errors is not None and self.err_n >= self.max_errors:
+            raise _AbortTypecheck()
 
     # ---- Spec-mapped rules Γ ⊢ e : T ----
 
     def type_of_expr(self, e: A.Expr) -> T.Type:
-        if isinstance(e, A.Literal):
-            if e.kind=="Int":
-                return T.INT
-            if e.kind=="Float":
-                return T.FLOAT
-            if e.kind=="Bool":
-                return T.BOOL
-            if e.kind=="Text":
-                return T.TEXT
-            if e.kind=="Null":
-                return T.NULL
-            return T.ANY
+        h=self._expr_dispatch.get(type(e))
+        return h(e) if h is not None else T.ANY
 
-        if isinstance(e, A.Var):
-            b=self.env.get(e.name)
-            if b is None:
-                self.error("HND-TC-0101", f"Undefined variable '{e.name}'.", 1, 1, f"Declare '{e.name}' before use (assign or add parameter type).")
-                return T.ANY
-            t=self.env.current_type(e.name)
-            assert t is not None
-            return t
-
-        if isinstance(e, A.Paren):
-            return self.type_of_expr(e.expr)
-
-        if isinstance(e, A.Unary):
-            t=self.type_of_expr(e.expr)
-            if e.op=="-":
-                if t==T.INT or t==T.FLOAT:
-                    return t
-                self.error("HND-TC-0201", f"Unary '-' requires Int or Float, got {t}.", 1, 1, "Ensure the expression is numeric (Int/Float).")
-                return T.ANY
-            self.error("HND-TC-0200", f"Unknown unary operator '{e.op}'.", 1, 1)
+    def _t_literal(self, e: A.Literal) -> T.Type:
+        return _LITERAL_TYPES.get(e.kind, T.ANY)
+
+    def _t_var(self, e: A.Var) -> T.Type:
+        b=self.env.get(e.name)
+        if b is None:
+            self.error("HND-TC-0101", "Undefined variable '{name}'.", 1, 1, "Declare '{name}' before use (assign or add parameter type).", name=e.name)
             return T.ANY
+        t=self.env.current_type(e.name)
+        assert t is not None
+        return t
+
+    def _t_paren(self, e: A.Paren) -> T.Type:
+        return self.type_of_expr(e.expr)
+
+    def _t_unary(self, e: A.Unary) -> T.Type:
+        t=self.type_of_expr(e.expr)
+        if e.op=="-":
+            if t is T.INT or t is T.FLOAT:
+                return t
+            self.error("HND-TC-0201", "Unary '-' requires Int or Float, got {t}.", 1, 1, "Ensure the expression is numeric (Int/Float).", t=t)
+            return T.ANY
+        self.error("HND-TC-0200", "Unknown unary operator '{op}'.", 1, 1, op=e.op)
+        return T.ANY
 
-        if isinstance(e, A.Binary):
-            lt=self.type_of_expr(e.left)
-            rt=self.type_of_expr(e.right)
-
-            if e.op in ("+","-","*","/","%"):
-                # Numeric ops
-                if lt in (T.INT, T.FLOAT) and rt in (T.INT, T.FLOAT):
-                    if lt==T.FLOAT or rt==T.FLOAT or e.op=="/":
-                        return T.FLOAT
-                    return T.INT
-                # Text concatenation for +
-                if e.op=="+" and lt==T.TEXT and rt==T.TEXT:
-                    return T.TEXT
-                self.error("HND-TC-0202", f"Operator '{e.op}' not defined for {lt} and {rt}.", 1, 1, "Use numeric types for arithmetic, or Text + Text for concatenation.")
-                return T.ANY
+    def _t_binary(self, e: A.Binary) -> T.Type:
+        lt=self.type_of_expr(e.left)
+        rt=self.type_of_expr(e.right)
 
-            if e.op in ("==","!="):
-                # allow compare any (but warn? v0.1 only error on Optional w/out verify? keep permissive)
-                # If comparing Optional[T] with Null: ok
-                return T.BOOL
+        if e.op in _ARITH_OPS:
+            # Numeric ops
+            if (lt is T.INT or lt is T.FLOAT) and (rt is T.INT or rt is T.FLOAT):
+                if lt is T.FLOAT or rt is T.FLOAT or e.op=="/":
+                    return T.FLOAT
+                return T.INT
+            # Text concatenation for +
+            if e.op=="+" and lt is T.TEXT and rt is T.TEXT:
+                return T.TEXT
+            self.error("HND-TC-0202", "Operator '{op}' not defined for {lt} and {rt}.", 1, 1, "Use numeric types for arithmetic, or Text + Text for concatenation.", op=e.op, lt=lt, rt=rt)
+            return T.ANY
+
+        if e.op in _EQ_OPS:
+            # allow compare any (but warn? v0.1 only error on Optional w/out verify? keep permissive)
+            # If comparing Optional[T] with Null: ok
+            return T.BOOL
 
-            if e.op in ("<","<=",">",">="):
-                if lt in (T.INT, T.FLOAT) and rt in (T.INT, T.FLOAT):
-                    return T.BOOL
-                self.error("HND-TC-0203", f"Comparison '{e.op}' requires numeric operands, got {lt} and {rt}.", 1, 1)
+        if e.op in _CMP_OPS:
+            if (lt is T.INT or lt is T.FLOAT) and (rt is T.INT or rt is T.FLOAT):
                 return T.BOOL
+            self.error("HND-TC-0203", "Comparison '{op}' requires numeric operands, got {lt} and {rt}.", 1, 1, op=e.op, lt=lt, rt=rt)
+            return T.BOOL
 
-            self.error("HND-TC-0200", f"Unknown binary operator '{e.op}'.", 1, 1)
-            return T.ANY
+        self.error("HND-TC-0200", "Unknown binary operator '{op}'.", 1, 1, op=e.op)
+        return T.ANY
 
-        if isinstance(e, A.Call):
-            # v0.1: only builtin functions
-            if e.callee=="len":
-                if len(e.args)!=1:
-                    self.error("HND-TC-0301", "len() expects exactly 1 argument.", 1, 1, "Call len(x).")
-                    return T.INT
-                # accept Any for now
-                _=self.type_of_expr(e.args[0])
+    def _t_call(self, e: A.Call) -> T.Type:
+        # v0.1: only builtin functions
+        if e.callee=="len":
+            if len(e.args)!=1:
+                self.error("HND-TC-0301", "len() expects exactly 1 argument.", 1, 1, "Call len(x).")
                 return T.INT
-            if e.callee=="ok":
-                # ok(x) -> Result[T, Text]
-                if len(e.args)!=1:
-                    self.error("HND-TC-0302", "ok() expects exactly 1 argument.", 1, 1, "Call ok(value).")
-                    return T.ANY
-                ot=self.type_of_expr(e.args[0])
-                return T.ResultT(ot, T.TEXT)
-            if e.callee=="err":
-                if len(e.args)!=1:
-                    self.error("HND-TC-0303", "err() expects exactly 1 argument.", 1, 1)
-                    return T.ANY
-                et=self.type_of_expr(e.args[0])
-                return T.ResultT(T.ANY, et)
-            # unknown call: treat as Any, but if variable bound to function not supported yet
-            self.error("HND-TC-0300", f"Unknown function '{e.callee}' in v0.1.", 1, 1, "Define the function with 🔧 or use a supported builtin.")
-            for a in e.args:
-                self.type_of_expr(a)
-            return T.ANY
-
+            # accept Any for now
+            _=self.type_of_expr(e.args[0])
+            return T.INT
+        if e.callee=="ok":
+            # ok(x) -> Result[T, Text]
+            if len(e.args)!=1:
+                self.error("HND-TC-0302", "ok() expects exactly 1 argument.", 1, 1, "Call ok(value).")
+                return T.ANY
+            ot=self.type_of_expr(e.args[0])
+            return T.ResultT(ot, T.TEXT)
+        if e.callee=="err":
+            if len(e.args)!=1:
+                self.error("HND-TC-0303", "err() expects exactly 1 argument.", 1, 1)
+                return T.ANY
+            et=self.type_of_expr(e.args[0])
+            return T.ResultT(T.ANY, et)
+        # unknown call: treat as Any, but if variable bound to function not supported yet
+        self.error("HND-TC-0300", "Unknown function '{callee}' in v0.1.", 1, 1, "Define the function with 🔧 or use a supported builtin.", callee=e.callee)
+        for a in e.args:
+            self.type_of_expr(a)
         return T.ANY
 
     # ---- TypeExpr (syntax) -> Type (semantic) ----
     def lower_typeexpr(self, te: A.TypeExpr) -> T.Type:
+        # AST nodes are immutable after parse, so a node lowers to the same type
+        # every time; the entry keeps the node alive so its id cannot be reused.
+        hit=self._lower_cache.get(id(te))
+        if hit is not None and hit[0] is te:
+            return hit[1]
+        err_n=self.err_n
+        t=self._lower_typeexpr(te)
+        if self.err_n==err_n:
+            # only error-free lowerings are cached; bad arity is reported each time
+            self._lower_cache[id(te)]=(te, t)
+        return t
+
+    def _lower_typeexpr(self, te: A.TypeExpr) -> T.Type:
         if isinstance(te, A.TypeName):
             n=te.name
             if n=="Int": return T.INT
@@ -185,12 +329,13 @@ class TypeChecker:
             base=te.base.name
             args=[self.lower_typeexpr(a) for a in te.args]
 
-            def bad_arity(expected: str):
+            def bad_arity(expected: str) -> None:
                 self.error(
                     "HND-TC-1001",
-                    f"Type '{base}' expects {expected}, got {len(args)} argument(s).",
+                    "Type '{base}' expects {expected}, got {n} argument(s).",
                     1, 1,
-                    f"Use {base}[{expected}] with the correct number of type arguments."
+                    "Use {base}[{expected}] with the correct number of type arguments.",
+                    base=base, expected=expected, n=len(args),
                 )
 
             if base=="List":
@@ -223,178 +368,175 @@ class TypeChecker:
 
         return T.ANY
 
-# ---- Statements ----
-    def check_stmt(self, st: A.Stmt):
-        if isinstance(st, A.AssignStmt):
-            rhs=self.type_of_expr(st.value)
-            if st.declared_type is not None:
-                dt=self.lower_typeexpr(st.declared_type)
-                if not T.assignable(rhs, dt):
-                    self.error("HND-TC-1101", f"Cannot assign {rhs} to '{st.name}' of type {dt}.", 1, 1,
-                               f"Change the declared type of '{st.name}' or convert the value to {dt}.")
-                self.env.set(st.name, dt)
+    # ---- Statements ----
+    def check_stmt(self, st: A.Stmt) -> None:
+        h=self._stmt_dispatch.get(type(st))
+        if h is not None:
+            h(st)
+
+    def _c_assign(self, st: A.AssignStmt) -> None:
+        rhs=self.type_of_expr(st.value)
+        if st.declared_type is not None:
+            dt=self.lower_typeexpr(st.declared_type)
+            if not T.assignable(rhs, dt):
+                self.error("HND-TC-1101", "Cannot assign {rhs} to '{name}' of type {dt}.", 1, 1,
+                           "Change the declared type of '{name}' or convert the value to {dt}.", rhs=rhs, name=st.name, dt=dt)
+            self.env.set(st.name, dt)
+        else:
+            # infer: if assigning null to something already declared Optional, keep Optional
+            prev=self.env.get(st.name)
+            if prev is not None and isinstance(prev.typ, T.OptionalT) and rhs is T.NULL:
+                self.env.set(st.name, prev.typ)
             else:
-                # infer: if assigning null to something already declared Optional, keep Optional
-                prev=self.env.get(st.name)
-                if prev is not None and isinstance(prev.typ, T.OptionalT) and rhs==T.NULL:
-                    self.env.set(st.name, prev.typ)
-                else:
-                    self.env.set(st.name, rhs)
-            return
-
-        if isinstance(st, A.ShowStmt):
-            _=self.type_of_expr(st.value)
-            return
-
-        if isinstance(st, A.ExprStmt):
-            _=self.type_of_expr(st.expr)
-            return
-
-        if isinstance(st, A.VerifyStmt):
-            # only pattern recognized: (Var != null)
-            expr=st.expr
-            if isinstance(expr, A.Binary) and expr.op=="!=" and isinstance(expr.left, A.Var) and isinstance(expr.right, A.Literal) and expr.right.kind=="Null":
-                name=expr.left.name
-                bt=self.env.get(name)
-                if bt is None:
-                    self.error("HND-TC-1201", f"VERIFY references undefined variable '{name}'.", 1, 1, f"Declare '{name}' before VERIFY.")
-                    return
-                if not isinstance(bt.typ, T.OptionalT):
-                    # verifying non-optional is redundant but ok
-                    return
-                self.env.refine_non_null(name)
-                return
-            # keyword verify x : treat as non-null check only if x is optional
-            if isinstance(expr, A.Var):
-                name=expr.name
-                bt=self.env.get(name)
-                if bt and isinstance(bt.typ, T.OptionalT):
-                    self.env.refine_non_null(name)
-                    return
-            # otherwise, VERIFY is allowed but doesn't refine
-            _=self.type_of_expr(expr)
-            return
-
-        if isinstance(st, A.ReturnStmt):
-            if self.current_return is None:
-                # return at top-level is allowed but type is Any
-                if st.value is not None:
-                    _=self.type_of_expr(st.value)
+                self.env.set(st.name, rhs)
+
+    def _c_show(self, st: A.ShowStmt) -> None:
+        _=self.type_of_expr(st.value)
+
+    def _c_expr(self, st: A.ExprStmt) -> None:
+        _=self.type_of_expr(st.expr)
+
+    def _c_verify(self, st: A.VerifyStmt) -> None:
+        # only pattern recognized: (Var != null)
+        expr=st.expr
+        if isinstance(expr, A.Binary) and expr.op=="!=" and isinstance(expr.left, A.Var) and isinstance(expr.right, A.Literal) and expr.right.kind=="Null":
+            name=expr.left.name
+            bt=self.env.get(name)
+            if bt is None:
+                self.error("HND-TC-1201", "VERIFY references undefined variable '{name}'.", 1, 1, "Declare '{name}' before VERIFY.", name=name)
                 return
-            if st.value is None:
-                # returning null: only ok if return type optional or Null
-                if not (self.current_return==T.NULL or isinstance(self.current_return, T.OptionalT)):
-                    self.error("HND-TC-1301", f"Return type is {self.current_return}, but 'return' has no value.", 1, 1,
-                               f"Return a value of type {self.current_return}, or declare return type as Optional ({self.current_return}?).")
+            if not isinstance(bt.typ, T.OptionalT):
+                # verifying non-optional is redundant but ok
                 return
-            rt=self.type_of_expr(st.value)
-            if not T.assignable(rt, self.current_return):
-                self.error("HND-TC-1302", f"Return type mismatch: expected {self.current_return}, got {rt}.", 1, 1,
-                           f"Return a {self.current_return}, or change function return type.")
+            self.env.refine_non_null(name)
             return
-
-        if isinstance(st, A.IfStmt):
-            ct=self.type_of_expr(st.cond)
-            if ct != T.BOOL and not isinstance(ct, T.AnyT):
-                self.error("HND-TC-1401", f"If condition must be Bool, got {ct}.", 1, 1, "Use a boolean expression in if condition.")
-            # flow: check then/else in separate scopes, then merge bindings conservatively
-            before=self._snapshot_env()
-            then_env=self._check_block_with_env(st.then_body, before)
-            else_env=before
-            if st.else_body is not None:
-                else_env=self._check_block_with_env(st.else_body, before)
-            self._merge_env(before, then_env, else_env)
-            return
-
-        if isinstance(st, A.WhileStmt):
-            ct=self.type_of_expr(st.cond)
-            if ct != T.BOOL and not isinstance(ct, T.AnyT):
-                self.error("HND-TC-1501", f"While condition must be Bool, got {ct}.", 1, 1)
-            # conservative: check body but do not assume it runs
-            before=self._snapshot_env()
-            _=self._check_block_with_env(st.body, before)
-            self._restore_env(before)
+        # keyword verify x : treat as non-null check only if x is optional
+        if isinstance(expr, A.Var):
+            name=expr.name
+            bt=self.env.get(name)
+            if bt and isinstance(bt.typ, T.OptionalT):
+                self.env.refine_non_null(name)
+                return
+        # otherwise, VERIFY is allowed but doesn't refine
+        _=self.type_of_expr(expr)
+
+    def _c_return(self, st: A.ReturnStmt) -> None:
+        if self.current_return is None:
+            # return at top-level is allowed but type is Any
+            if st.value is not None:
+                _=self.type_of_expr(st.value)
             return
-
-        if isinstance(st, A.FuncDef):
-            # bind function name in env as Any (call typing not supported yet)
-            # enter scope with params
-            old_return=self.current_return
-            self.env.push()
-            for p in st.params:
-                if p.type is None:
-                    self.env.set(p.name, T.ANY)
-                else:
-                    self.env.set(p.name, self.lower_typeexpr(p.type))
-            self.current_return = self.lower_typeexpr(st.return_type) if st.return_type else None
-            for s in st.body:
-                self.check_stmt(s)
-            self.current_return = old_return
-            self.env.pop()
+        if st.value is None:
+            # returning null: only ok if return type optional or Null
+            if not (self.current_return is T.NULL or isinstance(self.current_return, T.OptionalT)):
+                self.error("HND-TC-1301", "Return type is {ret}, but 'return' has no value.", 1, 1,
+                           "Return a value of type {ret}, or declare return type as Optional ({ret}?).", ret=self.current_return)
             return
+        rt=self.type_of_expr(st.value)
+        if not T.assignable(rt, self.current_return):
+            self.error("HND-TC-1302", "Return type mismatch: expected {ret}, got {rt}.", 1, 1,
+                       "Return a {ret}, or change function return type.", ret=self.current_return, rt=rt)
+
+    def _c_if(self, st: A.IfStmt) -> None:
+        ct=self.type_of_expr(st.cond)
+        if ct is not T.BOOL and not isinstance(ct, T.AnyT):
+            self.error("HND-TC-1401", "If condition must be Bool, got {ct}.", 1, 1, "Use a boolean expression in if condition.", ct=ct)
+        # flow: check then/else in separate scopes, then merge bindings conservatively
+        before=self._snapshot_env()
+        then_env=self._check_block_with_env(st.then_body, before)
+        else_env: Dict[str, Optional[Binding]]={}
+        if st.else_body is not None:
+            else_env=self._check_block_with_env(st.else_body, before)
+        self._merge_env(before, then_env, else_env)
+
+    def _c_while(self, st: A.WhileStmt) -> None:
+        ct=self.type_of_expr(st.cond)
+        if ct is not T.BOOL and not isinstance(ct, T.AnyT):
+            self.error("HND-TC-1501", "While condition must be Bool, got {ct}.", 1, 1, ct=ct)
+        # conservative: check body but do not assume it runs
+        before=self._snapshot_env()
+        _=self._check_block_with_env(st.body, before)
+
+    def _c_funcdef(self, st: A.FuncDef) -> None:
+        # bind function name in env as Any (call typing not supported yet)
+        # enter scope with params
+        old_return=self.current_return
+        self.env.push()
+        for p in st.params:
+            if p.type is None:
+                self.env.set(p.name, T.ANY)
+            else:
+                self.env.set(p.name, self.lower_typeexpr(p.type))
+        self.current_return = self.lower_typeexpr(st.return_type) if st.return_type else None
+        for s in st.body:
+            self.check_stmt(s)
+        self.current_return = old_return
+        self.env.pop()
 
-    def _snapshot_env(self) -> List[Dict[str, Binding]]:
-        # deep copy frames and bindings (bindings are mutable due to refinement)
-        snap=[]
-        for fr in self.env.frames:
-            snap.append({k: Binding(v.typ, v.proven_non_null) for k,v in fr.items()})
-        return snap
+    def _snapshot_env(self) -> int:
+        return self.env.mark()
 
-    def _restore_env(self, snap: List[Dict[str, Binding]]):
-        self.env.frames = [{k: Binding(v.typ, v.proven_non_null) for k,v in fr.items()} for fr in snap]
+    def _restore_env(self, snap: int) -> None:
+        self.env.rollback(snap)
 
-    def _check_block_with_env(self, block: List[A.Stmt], snap: List[Dict[str, Binding]]) -> List[Dict[str, Binding]]:
+    def _check_block_with_env(self, block: List[A.Stmt], snap: int) -> Dict[str, Optional[Binding]]:
+        """Check `block` from the `snap` state; return the bindings it changed and roll back."""
         self._restore_env(snap)
         self.env.push()
         for s in block:
             self.check_stmt(s)
-        # capture resulting env (including outer + inner). Pop inner scope first, but keep changes to outer? v0.1 simple: flatten
-        # We'll merge inner frame into outer frame on exit.
-        inner=self.env.frames.pop()
-        outer=self.env.frames[-1]
-        outer.update(inner)
-        result=self._snapshot_env()
-        return result
-
-    def _merge_env(self, before: List[Dict[str, Binding]], then_env: List[Dict[str, Binding]], else_env: List[Dict[str, Binding]]):
-        # merge only top frame variables (global for v0.1)
-        merged={}
-        # collect union of names
-        names=set()
-        for fr in then_env:
-            names |= set(fr.keys())
-        for fr in else_env:
-            names |= set(fr.keys())
+        # v0.1 simple: flatten the inner scope into the outer one on exit.
+        self.env.pop_into_parent()
+        changed={name: self.env.get(name) for name in self.env.changed_since(snap)}
+        self._restore_env(snap)
+        return changed
+
+    def _merge_env(self, before: int, then_env: Dict[str, Optional[Binding]], else_env: Dict[str, Optional[Binding]]) -> None:
+        # Every visible variable is rebound in the current scope (global for v0.1)
+        # with the join of both branches; a branch that did not touch a name
+        # sees its binding from `before`.
+        self._restore_env(before)
+        table=self.env.table
+        top=self.env.scopes[-1]
+        merged: Dict[str, Binding]={}
+        names=set(table)
+        names.update(then_env)
+        names.update(else_env)
         for name in names:
-            t_then=self._lookup_in_snap(then_env, name)
-            t_else=self._lookup_in_snap(else_env, name)
+            stack=table.get(name)
+            cur=stack[-1] if stack else None
+            t_then=then_env.get(name, cur)
+            t_else=else_env.get(name, cur)
             if t_then is None:
+                if t_else is None:
+                    continue
                 t=t_else.typ
-            elif t_else is None:
+            elif t_else is None or t_else is t_then:
                 t=t_then.typ
             else:
                 t=T.join(t_then.typ, t_else.typ)
-            merged[name]=Binding(t, False)
-        # restore base env and apply merged to last frame
-        self._restore_env(before)
-        self.env.frames[-1].update(merged)
-
-    def _lookup_in_snap(self, snap: List[Dict[str, Binding]], name: str) -> Optional[Binding]:
-        for fr in reversed(snap):
-            if name in fr:
-                return fr[name]
-        return None
-
-def typecheck(program: A.Program, filename: str="<input>") -> List[Diagnostic]:
-    tc=TypeChecker(filename)
-    for item in program.items:
-        if isinstance(item, A.Section):
-            # typecheck section body only
-            if item.body:
-                tc.env.push()
-                for st in item.body:
-                    tc.check_stmt(st)
-                tc.env.pop()
-        else:
-            tc.check_stmt(item)
+            b=_mk_binding(t, False)
+            if b is cur and name in top:
+                # rebinding the same interned value in the same scope is a no-op;
+                # skipping it also keeps it out of the journal
+                continue
+            merged[name]=b
+        for name, b in merged.items():
+            self.env.bind(name, b)
+
+def typecheck(program: A.Program, filename: str="<input>", max_errors: Optional[int]=None) -> List[Diagnostic]:
+    tc=TypeChecker(filename, max_errors)
+    try:
+        for item in program.items:
+            if isinstance(item, A.Section):
+                # typecheck section body only
+                if item.body:
+                    tc.env.push()
+                    for st in item.body:
+                        tc.check_stmt(st)
+                    tc.env.pop()
+            else:
+                tc.check_stmt(item)
+    except _AbortTypecheck:
+        pass
     return tc.diags
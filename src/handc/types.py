@@ -4,58 +4,65 @@ from typing import Tuple
 
 # ----- Type representation (normative, v0.1) -----
 class Type:
+    # no per-instance __dict__ anywhere in the hierarchy; fields live in slots
+    __slots__ = ()
+
     def __str__(self) -> str:
         raise NotImplementedError
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Prim(Type):
     name: str  # Int, Float, Bool, Text, Null
     def __str__(self) -> str:
         return self.name
+    def __reduce__(self):
+        # copies and unpickles resolve to the module singletons (see below)
+        return (_prim, (self.name,))
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AnyT(Type):
     def __str__(self) -> str:
         return "Any"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NeverT(Type):
     def __str__(self) -> str:
         return "Never"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OptionalT(Type):
     inner: Type
     def __str__(self) -> str:
         return f"{self.inner}?"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ListT(Type):
     elem: Type
     def __str__(self) -> str:
         return f"List[{self.elem}]"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MapT(Type):
     key: Type
     val: Type
     def __str__(self) -> str:
         return f"Map[{self.key},{self.val}]"
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RecordT(Type):
     name: str
     def __str__(self) -> str:
         return self.name
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ResultT(Type):
     ok: Type
     err: Type
     def __str__(self) -> str:
         return f"Result[{self.ok},{self.err}]"
 
-# Singletons
+# Singletons. Primitives are only ever created here, so they compare by
+# identity (`t is INT`); composite types still compare structurally.
 INT=Prim("Int")
 FLOAT=Prim("Float")
 BOOL=Prim("Bool")
@@ -64,6 +71,11 @@ NULL=Prim("Null")
 ANY=AnyT()
 NEVER=NeverT()
 
+_PRIMS={p.name: p for p in (INT, FLOAT, BOOL, TEXT, NULL)}
+
+def _prim(name: str) -> Prim:
+    return _PRIMS[name]
+
 def is_optional(t: Type) -> bool:
     return isinstance(t, OptionalT)
 
@@ -74,7 +86,7 @@ def make_optional(t: Type) -> Type:
     return t if isinstance(t, OptionalT) else OptionalT(t)
 
 def same(a: Type, b: Type) -> bool:
-    return a == b
+    return a is b or a == b
 
 def assignable(src: Type, dst: Type) -> bool:
     # Any rules
@@ -84,10 +96,10 @@ def assignable(src: Type, dst: Type) -> bool:
     if isinstance(src, NeverT):
         return True
     # Exact match
-    if src == dst:
+    if src is dst or src == dst:
         return True
     # Null into Optional[T]
-    if src == NULL and isinstance(dst, OptionalT):
+    if src is NULL and isinstance(dst, OptionalT):
         return True
     # T into Optional[T]
     if isinstance(dst, OptionalT) and assignable(src, dst.inner):
@@ -97,13 +109,13 @@ def assignable(src: Type, dst: Type) -> bool:
 
 def join(a: Type, b: Type) -> Type:
     """Least upper bound-ish for v0.1: used by if/else merges."""
-    if a == b:
+    if a is b or a == b:
         return a
     if isinstance(a, AnyT) or isinstance(b, AnyT):
         return ANY
-    if a == NULL:
+    if a is NULL:
         return make_optional(b)
-    if b == NULL:
+    if b is NULL:
         return make_optional(a)
     if isinstance(a, OptionalT) and not isinstance(b, OptionalT):
         return OptionalT(join(a.inner, b))
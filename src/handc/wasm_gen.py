@@ -1,6 +1,8 @@
 from __future__ import annotations
+import io
+import sys
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 @dataclass(frozen=True)
 class WasmNote:
@@ -15,10 +17,8 @@ class WasmGenError(Exception):
         self.note = note
 
 def _origin_ref(node: Dict[str, Any]) -> Optional[str]:
-    try:
-        return node.get("origin", {}).get("ref")
-    except Exception:
-        return None
+    o = node.get("origin")
+    return o.get("ref") if o else None
 
 def _ir_type_kind(t: Optional[Dict[str, Any]]) -> Optional[str]:
     if not t:
@@ -35,206 +35,239 @@ def _ensure_i32_type(t: Optional[Dict[str, Any]], *, origin: Optional[str]) -> N
         origin_ref=origin,
     ))
 
-def _require_pure_subset(ir: Dict[str, Any]) -> None:
-    mod = ir["module"]
-    if (mod.get("toplevel") or []):
-        raise WasmGenError(WasmNote(
-            kind="ERROR", code="WASM-0100",
-            message="WASM v0.1 supports only functions (no top-level statements).",
-            origin_ref=_origin_ref((mod.get('toplevel') or [])[0]),
-        ))
-    for fn in (mod.get("functions") or []):
-        for st in (fn.get("body") or []):
-            eff = st.get("effects") or []
-            # For v0.1: strictly forbid io.* and anything beyond compute
-            for e in eff:
-                if e not in ("contract.verify", "control.return"):
-                    raise WasmGenError(WasmNote(
-                        kind="ERROR", code="WASM-0200",
-                        message=f"WASM v0.1 forbids effect '{e}' (pure subset).",
-                        origin_ref=_origin_ref(st),
-                    ))
-            if st.get("kind") in ("show", "verify"):
+def _require_pure_fn(fn: Dict[str, Any]) -> None:
+    for st in (fn.get("body") or []):
+        eff = st.get("effects") or []
+        # For v0.1: strictly forbid io.* and anything beyond compute
+        for e in eff:
+            if e not in ("contract.verify", "control.return"):
                 raise WasmGenError(WasmNote(
-                    kind="ERROR", code="WASM-0201",
-                    message="WASM v0.1 forbids IO/VERIFY in pure subset (no host bindings in this backend).",
+                    kind="ERROR", code="WASM-0200",
+                    message=f"WASM v0.1 forbids effect '{e}' (pure subset).",
                     origin_ref=_origin_ref(st),
                 ))
+        if st.get("kind") in ("show", "verify"):
+            raise WasmGenError(WasmNote(
+                kind="ERROR", code="WASM-0201",
+                message="WASM v0.1 forbids IO/VERIFY in pure subset (no host bindings in this backend).",
+                origin_ref=_origin_ref(st),
+            ))
 
 class _FnCtx:
-    def __init__(self, params: List[str]):
+    def __init__(self, params: List[str], fn_names: Set[str], out: io.StringIO):
+        self.fn_names = fn_names
+        self.write = out.write
         self.locals: List[str] = []
-        self.var_to_local: Dict[str, str] = {}
-        for p in params:
-            self.var_to_local[p] = f"${p}"
+        self.var_to_local: Dict[str, str] = {p: sys.intern(f"${p}") for p in params}
+
+    def local_sym(self, name: str) -> str:
+        return self.var_to_local.get(name) or f"${name}"
 
     def ensure_local(self, name: str) -> str:
-        if name in self.var_to_local:
-            return self.var_to_local[name]
-        sym = f"${name}"
-        self.locals.append(sym)
+        sym = self.var_to_local.get(name)
+        if sym is not None:
+            return sym
+        sym = sys.intern(f"${name}")
         self.var_to_local[name] = sym
+        self.locals.append(sym)
         return sym
 
+_BINOP_INST: Dict[str, str] = {
+    "+":"i32.add","-":"i32.sub","*":"i32.mul","/":"i32.div_s",
+    "==":"i32.eq","!=":"i32.ne","<":"i32.lt_s","<=":"i32.le_s",
+    ">":"i32.gt_s",">=":"i32.ge_s","and":"i32.and","or":"i32.or",
+}
+_BOOL_LIT: Dict[str, int] = {"true": 1, "false": 0}
+
+# Function bodies are emitted by one loop over an explicit work stack instead
+# of recursive emitter calls. Each entry is (tag, item, indent): a finished
+# instruction line, a statement or expression still to expand, or a binary node
+# whose operator turned out to be unsupported (reported once its operands have
+# been emitted, as before). Expanders push their parts in reverse order.
+_LINE, _STMT, _EXPR, _BAD_BINOP = range(4)
+
+Push = Callable[[Tuple[int, Any, int]], None]
+
+def _expand_lit(ctx: _FnCtx, expr: Dict[str, Any], indent: int, push: Push) -> None:
+    ty = expr.get("type") or {}
+    _ensure_i32_type(ty, origin=_origin_ref(expr))
+    v = expr.get("value")
+    if isinstance(v, str):
+        s = v.strip().lower()
+        v = _BOOL_LIT.get(s)
+        if v is None:
+            v = int(s, 10)
+    if v is None:
+        raise WasmGenError(WasmNote("ERROR","WASM-0301","Null literal not supported.", _origin_ref(expr)))
+    push((_LINE, f"i32.const {int(v)}", indent))
+
+def _expand_var(ctx: _FnCtx, expr: Dict[str, Any], indent: int, push: Push) -> None:
+    # Reads don't declare locals; only assignments do.
+    push((_LINE, f"local.get {ctx.local_sym(expr['name'])}", indent))
+
+def _expand_unary(ctx: _FnCtx, expr: Dict[str, Any], indent: int, push: Push) -> None:
+    op = expr["op"]
+    if op == "-":
+        push((_LINE, "i32.sub", indent))
+        push((_EXPR, expr["expr"], indent))
+        push((_LINE, "i32.const 0", indent))
+        return
+    if op == "not":
+        push((_LINE, "i32.eqz", indent))
+        push((_EXPR, expr["expr"], indent))
+        return
+    raise WasmGenError(WasmNote("ERROR","WASM-0400",f"Unsupported unary op: {op}", _origin_ref(expr)))
+
+def _expand_binary(ctx: _FnCtx, expr: Dict[str, Any], indent: int, push: Push) -> None:
+    inst = _BINOP_INST.get(expr["op"])
+    push((_LINE, inst, indent) if inst else (_BAD_BINOP, expr, indent))
+    push((_EXPR, expr["right"], indent))
+    push((_EXPR, expr["left"], indent))
+
+def _expand_call(ctx: _FnCtx, expr: Dict[str, Any], indent: int, push: Push) -> None:
+    cal = expr["callee"]
+    if cal not in ctx.fn_names:
+        raise WasmGenError(WasmNote("ERROR","WASM-0500",f"Unsupported call target: {cal}", _origin_ref(expr)))
+    push((_LINE, f"call ${cal}", indent))
+    for a in reversed(expr.get("args") or []):
+        push((_EXPR, a, indent))
+
+_EXPAND_EXPR = {
+    "lit": _expand_lit,
+    "var": _expand_var,
+    "unary": _expand_unary,
+    "binary": _expand_binary,
+    "call": _expand_call,
+}
+
+def _expand_assign(ctx: _FnCtx, st: Dict[str, Any], indent: int, push: Push) -> None:
+    sym = ctx.ensure_local(st["name"])
+    push((_LINE, f"local.set {sym}", indent))
+    push((_EXPR, st["value"], indent))
+
+def _expand_expr_stmt(ctx: _FnCtx, st: Dict[str, Any], indent: int, push: Push) -> None:
+    push((_LINE, "drop", indent))
+    push((_EXPR, st["value"], indent))
+
+def _expand_return(ctx: _FnCtx, st: Dict[str, Any], indent: int, push: Push) -> None:
+    push((_LINE, "return", indent))
+    if st.get("value") is None:
+        push((_LINE, "i32.const 0", indent))
+    else:
+        push((_EXPR, st["value"], indent))
+
+def _expand_if(ctx: _FnCtx, st: Dict[str, Any], indent: int, push: Push) -> None:
+    push((_LINE, "end", indent))
+    els = st.get("else") or []
+    if els:
+        for x in reversed(els):
+            push((_STMT, x, indent + 2))
+        push((_LINE, "else", indent))
+    for x in reversed(st.get("then") or []):
+        push((_STMT, x, indent + 2))
+    push((_LINE, "if", indent))
+    push((_EXPR, st["cond"], indent))
+
+def _expand_while(ctx: _FnCtx, st: Dict[str, Any], indent: int, push: Push) -> None:
+    push((_LINE, "end", indent))
+    push((_LINE, "end", indent + 2))
+    push((_LINE, "br $loop", indent + 4))
+    for x in reversed(st.get("body") or []):
+        push((_STMT, x, indent + 4))
+    push((_LINE, "br_if $exit", indent + 4))
+    push((_LINE, "i32.eqz", indent + 4))
+    push((_EXPR, st["cond"], indent + 4))
+    push((_LINE, "loop $loop", indent + 2))
+    push((_LINE, "block $exit", indent))
+
+_EXPAND_STMT = {
+    "assign": _expand_assign,
+    "expr": _expand_expr_stmt,
+    "return": _expand_return,
+    "if": _expand_if,
+    "while": _expand_while,
+}
+
+def _emit_stmts(ctx: _FnCtx, stmts: List[Dict[str, Any]], indent: int) -> None:
+    write = ctx.write
+    stack: List[Tuple[int, Any, int]] = [(_STMT, st, indent) for st in reversed(stmts)]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        tag, item, ind = pop()
+        if tag == _LINE:
+            write(f"{' ' * ind}{item}\n")
+        elif tag == _EXPR:
+            k = item["kind"]
+            h = _EXPAND_EXPR.get(k)
+            if h is None:
+                raise WasmGenError(WasmNote("ERROR","WASM-0999",f"Unknown expr kind: {k}", _origin_ref(item)))
+            h(ctx, item, ind, push)
+        elif tag == _STMT:
+            k = item["kind"]
+            h = _EXPAND_STMT.get(k)
+            if h is None:
+                raise WasmGenError(WasmNote("ERROR","WASM-0600",f"Unsupported statement kind: {k}", _origin_ref(item)))
+            h(ctx, item, ind, push)
+        else:  # _BAD_BINOP
+            raise WasmGenError(WasmNote("ERROR","WASM-0401",f"Unsupported binary op: {item['op']}", _origin_ref(item)))
+
 def gen_wat(ir: Dict[str, Any]) -> Tuple[str, List[WasmNote]]:
     """Generate WAT for WASM v0.1 (pure subset).
     Returns: (wat_text, notes). If a hard limitation is hit, raises WasmGenError.
     """
     if ir.get("ir_version") != "0.1.0":
         raise ValueError("Unsupported IR version")
-    _require_pure_subset(ir)
+    mod = ir["module"]
+    toplevel = mod.get("toplevel") or []
+    if toplevel:
+        raise WasmGenError(WasmNote(
+            kind="ERROR", code="WASM-0100",
+            message="WASM v0.1 supports only functions (no top-level statements).",
+            origin_ref=_origin_ref(toplevel[0]),
+        ))
 
     notes: List[WasmNote] = []
-    mod = ir["module"]
-    fn_names = [fn["name"] for fn in (mod.get("functions") or [])]
+    fn_names: Set[str] = {fn["name"] for fn in (mod.get("functions") or [])}
+
+    # Lines go straight into a text buffer rather than a list joined at the end.
+    out = io.StringIO()
+    write = out.write
+
+    def emit(line: str) -> None:
+        write(line)
+        write("\n")
 
-    lines: List[str] = []
-    emit = lines.append
     emit("(module")
     emit('  (memory (export "memory") 1) ;; reserved (unused in pure subset)')
     emit("")
 
-    def emit_expr(ctx: _FnCtx, expr: Dict[str, Any]) -> List[str]:
-        k = expr["kind"]
-        out: List[str] = []
-        if k == "lit":
-            ty = expr.get("type") or {}
-            _ensure_i32_type(ty, origin=_origin_ref(expr))
-            v = expr.get("value")
-            if isinstance(v, str):
-                s = v.strip().lower()
-                if s == "true":
-                    v = 1
-                elif s == "false":
-                    v = 0
-                else:
-                    v = int(s, 10)
-            if v is None:
-                raise WasmGenError(WasmNote("ERROR","WASM-0301","Null literal not supported.", _origin_ref(expr)))
-            out.append(f"i32.const {int(v)}")
-            return out
-        if k == "var":
-            sym = ctx.ensure_local(expr["name"])
-            out.append(f"local.get {sym}")
-            return out
-        if k == "unary":
-            op = expr["op"]
-            if op == "-":
-                out.append("i32.const 0")
-                out.extend(emit_expr(ctx, expr["expr"]))
-                out.append("i32.sub")
-                return out
-            if op == "not":
-                out.extend(emit_expr(ctx, expr["expr"]))
-                out.append("i32.eqz")
-                return out
-            raise WasmGenError(WasmNote("ERROR","WASM-0400",f"Unsupported unary op: {op}", _origin_ref(expr)))
-        if k == "binary":
-            op = expr["op"]
-            out.extend(emit_expr(ctx, expr["left"]))
-            out.extend(emit_expr(ctx, expr["right"]))
-            opmap = {
-                "+":"i32.add","-":"i32.sub","*":"i32.mul","/":"i32.div_s",
-                "==":"i32.eq","!=":"i32.ne","<":"i32.lt_s","<=":"i32.le_s",
-                ">":"i32.gt_s",">=":"i32.ge_s","and":"i32.and","or":"i32.or",
-            }
-            inst = opmap.get(op)
-            if not inst:
-                raise WasmGenError(WasmNote("ERROR","WASM-0401",f"Unsupported binary op: {op}", _origin_ref(expr)))
-            out.append(inst)
-            return out
-        if k == "call":
-            cal = expr["callee"]
-            if cal not in fn_names:
-                raise WasmGenError(WasmNote("ERROR","WASM-0500",f"Unsupported call target: {cal}", _origin_ref(expr)))
-            for a in (expr.get("args") or []):
-                out.extend(emit_expr(ctx, a))
-            out.append(f"call ${cal}")
-            return out
-        raise WasmGenError(WasmNote("ERROR","WASM-0999",f"Unknown expr kind: {k}", _origin_ref(expr)))
-
-    def emit_stmt(ctx: _FnCtx, st: Dict[str, Any]) -> List[str]:
-        k = st["kind"]
-        out: List[str] = []
-        if k == "assign":
-            sym = ctx.ensure_local(st["name"])
-            out.extend(emit_expr(ctx, st["value"]))
-            out.append(f"local.set {sym}")
-            return out
-        if k == "expr":
-            out.extend(emit_expr(ctx, st["value"]))
-            out.append("drop")
-            return out
-        if k == "return":
-            if st.get("value") is None:
-                out.append("i32.const 0")
-            else:
-                out.extend(emit_expr(ctx, st["value"]))
-            out.append("return")
-            return out
-        if k == "if":
-            out.extend(emit_expr(ctx, st["cond"]))
-            out.append("if")
-            for x in (st.get("then") or []):
-                out.extend(["  " + i for i in emit_stmt(ctx, x)])
-            els = st.get("else") or []
-            if els:
-                out.append("else")
-                for x in els:
-                    out.extend(["  " + i for i in emit_stmt(ctx, x)])
-            out.append("end")
-            return out
-        if k == "while":
-            out.append("block $exit")
-            out.append("  loop $loop")
-            out.extend(["    " + i for i in emit_expr(ctx, st["cond"])])
-            out.append("    i32.eqz")
-            out.append("    br_if $exit")
-            for x in (st.get("body") or []):
-                out.extend(["    " + i for i in emit_stmt(ctx, x)])
-            out.append("    br $loop")
-            out.append("  end")
-            out.append("end")
-            return out
-        raise WasmGenError(WasmNote("ERROR","WASM-0600",f"Unsupported statement kind: {k}", _origin_ref(st)))
-
     for fn in (mod.get("functions") or []):
+        # pure-subset check happens per function, in the same pass as codegen
+        _require_pure_fn(fn)
         name = fn["name"]
         params = [p["name"] for p in (fn.get("params") or [])]
         for p in (fn.get("params") or []):
             _ensure_i32_type(p.get("type"), origin=_origin_ref(p))
         _ensure_i32_type(fn.get("ret_type"), origin=_origin_ref(fn))
 
-        ctx = _FnCtx(params)
-
-        def scan(sts: List[Dict[str, Any]]):
-            for st in sts:
-                if st["kind"] == "assign":
-                    ctx.ensure_local(st["name"])
-                if st["kind"] == "if":
-                    scan(st.get("then") or [])
-                    scan(st.get("else") or [])
-                if st["kind"] == "while":
-                    scan(st.get("body") or [])
-        scan(fn.get("body") or [])
+        # Locals are discovered while the body is emitted (every assign goes
+        # through ensure_local), so buffer the body and emit the declarations
+        # ahead of it.
+        body = io.StringIO()
+        ctx = _FnCtx(params, fn_names, body)
+        _emit_stmts(ctx, fn.get("body") or [], 4)
 
         header = f'  (func ${name} ' + " ".join(f"(param ${p} i32)" for p in params) + " (result i32)"
         emit(header)
         for loc in ctx.locals:
             emit(f"    (local {loc} i32)")
-        body = fn.get("body") or []
-        if not body:
-            emit("    i32.const 0")
-            emit("    return")
-        else:
-            for st in body:
-                for inst in emit_stmt(ctx, st):
-                    emit("    " + inst)
-            emit("    i32.const 0")
-            emit("    return")
+        write(body.getvalue())
+        emit("    i32.const 0")
+        emit("    return")
         emit("  )")
         emit(f'  (export "{name}" (func ${name}))')
         emit("")
 
     emit(")")
-    return "\n".join(lines) + "\n", notes
+    return out.getvalue(), notes
@@ -0,0 +1,19 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+_SPEC = importlib.util.spec_from_file_location(
+    "exportaprogramas", Path(__file__).resolve().parents[1] / "SALIDA" / "exportaprogramas.py")
+exportaprogramas = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(exportaprogramas)
+
+@pytest.mark.parametrize("text", [
+    "",
+    "abc DEF_123 !?",
+    "x² + y³ = ½ ñandú",
+    "²½³¼",
+    "Ωmega ৴ ୲ ௰ 一二",
+])
+def test_count_alpha_matches_isalpha(text):
+    assert exportaprogramas.count_alpha(text) == sum(ch.isalpha() for ch in text)
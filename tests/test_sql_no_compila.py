@@ -19,3 +19,8 @@ def test_no_control_flow_stmt():
     with pytest.raises(SqlGenError) as ei:
         gen_sql(ir)
     assert ei.value.note.code == "SQL-0002"
+
+def test_float_literals_keep_sign_of_zero():
+    from handc.sql_gen import _lit_to_sql
+    assert _lit_to_sql({"kind":"lit","value":0.0,"type":{"kind":"Float"}}) == "0.0"
+    assert _lit_to_sql({"kind":"lit","value":-0.0,"type":{"kind":"Float"}}) == "-0.0"
@@ -0,0 +1,21 @@
+from handc.lexer import lex
+from handc.parser import parse
+from handc.typecheck import typecheck
+
+SRC = "".join(f"show u{i}\n" for i in range(20))
+
+def _program():
+    toks, ldiags = lex(SRC, "budget.hand")
+    assert not ldiags
+    pres = parse(toks, "budget.hand")
+    assert not pres.diagnostics
+    return pres.program
+
+def test_typecheck_reports_every_error_by_default():
+    diags = typecheck(_program(), "budget.hand")
+    assert len(diags) == 20
+
+def test_typecheck_stops_at_max_errors():
+    full = typecheck(_program(), "budget.hand")
+    diags = typecheck(_program(), "budget.hand", max_errors=5)
+    assert [str(d) for d in diags] == [str(d) for d in full[:5]]
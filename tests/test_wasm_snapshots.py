@@ -28,3 +28,16 @@ def test_wasm_wat_snapshot(name):
     exp_path = SNAP_DIR / f"{name}.wat"
     assert exp_path.exists()
     assert wat == exp_path.read_text(encoding="utf-8")
+
+def test_wasm_deep_expression_does_not_recurse():
+    e = {"kind": "var", "name": "a"}
+    for _ in range(5000):
+        e = {"kind": "binary", "op": "+", "left": e, "right": {"kind": "var", "name": "a"}}
+    ir = {"ir_version": "0.1.0", "module": {"toplevel": [], "functions": [{
+        "name": "f",
+        "params": [{"name": "a", "type": {"kind": "Int"}}],
+        "ret_type": {"kind": "Int"},
+        "body": [{"kind": "return", "value": e}],
+    }]}}
+    wat, _ = gen_wat(ir)
+    assert wat.count("i32.add") == 5000
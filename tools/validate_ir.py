@@ -1,30 +1,62 @@
 from __future__ import annotations
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     import jsonschema
 except ImportError:
     raise SystemExit("validate_ir requires jsonschema (add to dev deps).")
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Files below this count are validated in-process; forking workers costs more
+# than it saves.
+_PARALLEL_MIN_FILES = 4
+
+_validator: Any = None
+
+def _init_validator(schema: Dict[str, Any]) -> None:
+    # Check the schema and build the validator once per process; jsonschema.validate()
+    # would redo both for every document.
+    global _validator
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    _validator = cls(schema)
+
+def _validate_one(p: str) -> Tuple[str, Optional[str]]:
+    j = _loads(Path(p).read_bytes())
+    err = jsonschema.exceptions.best_match(_validator.iter_errors(j))
+    return p, (None if err is None else str(err))
+
 def main(argv: Optional[List[str]] = None) -> int:
     argv = argv or sys.argv[1:]
     if len(argv) < 2:
         raise SystemExit("usage: validate_ir.py hand_ir.schema.json <ir.json> [<ir2.json> ...]")
     schema_path = Path(argv[0])
-    schema = json.loads(schema_path.read_text(encoding="utf-8"))
+    schema = _loads(schema_path.read_bytes())
+    paths = argv[1:]
+    if len(paths) >= _PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(initializer=_init_validator, initargs=(schema,)) as ex:
+            results = list(ex.map(_validate_one, paths))
+    else:
+        _init_validator(schema)
+        results = [_validate_one(p) for p in paths]
     ok = 0
     bad = 0
-    for p in argv[1:]:
-        j = json.loads(Path(p).read_text(encoding="utf-8"))
-        try:
-            jsonschema.validate(j, schema)
+    for p, err in results:
+        if err is None:
             ok += 1
-        except Exception as e:
+        else:
             bad += 1
-            print(f"INVALID {p}: {e}")
+            print(f"INVALID {p}: {err}")
     print(f"validated ok={ok} bad={bad}")
     return 0 if bad == 0 else 2
 